@@ -0,0 +1,186 @@
+"""Run the trimming and/or enhancement pipelines over many decks at once.
+
+Usage:
+    python batch.py DECKS_DIR_OR_MANIFEST [--mode enhance|trim|both]
+                    [--output-dir batch_output] [--workers N]
+                    [--trim-mode stream|subset|rebuild] [--scorer llm|local] [--pipelined]
+                    [--dedup-threshold 0.9]
+                    [--summary batch_summary.json]
+
+A manifest is a text file with one .pptx path per line, or a JSON list of
+paths. Each deck runs in its own worker process with images kept in
+memory (and a private temporary image directory as a fallback), and
+per-deck results and failures are written to the summary JSON.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def find_decks(source):
+    """Return the .pptx paths listed by a directory or manifest file"""
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, name) for name in os.listdir(source)
+            if name.lower().endswith(".pptx") and not name.startswith("~$")
+        )
+    with open(source, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        paths = json.loads(text)
+    else:
+        paths = [line.strip() for line in text.splitlines() if line.strip() and not line.startswith("#")]
+    # Relative entries are relative to the manifest, not to wherever the batch is run from
+    return [os.path.join(os.path.dirname(source), path) for path in paths]
+
+
+def output_names(decks):
+    """Return a distinct output name for each deck, from its path below the decks' common directory"""
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(deck)) for deck in decks]) if decks else ""
+    names = []
+    for deck in decks:
+        relative = os.path.relpath(os.path.abspath(deck), root)
+        names.append(os.path.splitext(relative)[0].replace(os.sep, "_"))
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Decks would share output names: {', '.join(duplicates)}")
+    return names
+
+
+def process_deck(input_path, output_dir, mode="enhance", template_path=None, score_cache_path=None,
+                 image_cache_dir=None, incremental=False, trim_mode="stream", scorer="llm", pipelined=False,
+                 name=None, dedup_threshold=None):
+    """Run one deck through the pipelines; executed inside a worker process"""
+    name = name or os.path.splitext(os.path.basename(input_path))[0]
+    result = {"input": input_path, "mode": mode, "outputs": {}}
+    start = time.perf_counter()
+    try:
+        enhance_input = input_path
+        if mode in ("trim", "both"):
+            # main.py builds its OpenAI client on import, so only load it when trimming
+            import main
+            from metrics import PipelineMetrics
+            from score_cache import ScoreCache
+
+            cache = None
+            if score_cache_path and scorer == "llm":
+                cache = ScoreCache(score_cache_path, model=main.SCORING_MODEL,
+                                   prompt_version=main.SCORING_PROMPT_VERSION)
+            trimmed_path = os.path.join(output_dir, f"{name}_trimmed.pptx")
+            trim_metrics = PipelineMetrics()
+            main.trim_presentation(input_path, trimmed_path, metrics=trim_metrics, trim_mode=trim_mode,
+                                   scorer=main.make_scorer(scorer, cache=cache), dedup_threshold=dedup_threshold)
+            result["trim_metrics"] = trim_metrics.report()
+            result["outputs"]["trimmed"] = trimmed_path
+            enhance_input = trimmed_path
+
+        if mode in ("enhance", "both"):
+            from image_cache import ImageCache
+            from main2 import PowerPointProcessor
+
+            image_cache = ImageCache(image_cache_dir) if image_cache_dir else None
+            # Images stay in memory; the private image_dir is only a safety net
+            with tempfile.TemporaryDirectory(prefix="pics_") as image_dir:
+                processor = PowerPointProcessor(template_path=template_path, image_dir=image_dir,
+                                                image_cache=image_cache, in_memory=True)
+                enhanced_path = os.path.join(output_dir, f"{name}_enhanced.pptx")
+                processor.process_presentation(enhance_input, enhanced_path, incremental=incremental,
+                                               pipelined=pipelined, dedup_threshold=dedup_threshold)
+            result["outputs"]["enhanced"] = enhanced_path
+            result["enhance_metrics"] = processor.metrics.report()
+            if image_cache is not None:
+                result["image_cache"] = image_cache.stats()
+
+        result["status"] = "ok"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["traceback"] = traceback.format_exc()
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_batch(decks, output_dir, mode="enhance", workers=None, template_path=None, score_cache_path=None,
+              image_cache_dir=None, incremental=False, trim_mode="stream", scorer="llm", pipelined=False,
+              dedup_threshold=None):
+    """Process decks across a process pool and return the summary dict"""
+    # Checked before any work starts so that no deck overwrites another's outputs
+    names = output_names(decks)
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(process_deck, deck, output_dir, mode, template_path, score_cache_path,
+                            image_cache_dir, incremental, trim_mode, scorer, pipelined, name, dedup_threshold)
+            for deck, name in zip(decks, names)
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            marker = "✅" if result["status"] == "ok" else "❌"
+            print(f"{marker} {result['input']} ({result['seconds']}s)")
+            results.append(result)
+
+    order = {deck: i for i, deck in enumerate(decks)}
+    results.sort(key=lambda r: order[r["input"]])
+    return {
+        "mode": mode,
+        "workers": workers or os.cpu_count(),
+        "total_seconds": round(time.perf_counter() - start, 3),
+        "succeeded": sum(1 for r in results if r["status"] == "ok"),
+        "failed": sum(1 for r in results if r["status"] != "ok"),
+        "decks": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process many PowerPoint decks in parallel")
+    parser.add_argument("source", help="directory of .pptx files or a manifest file")
+    parser.add_argument("--mode", choices=["enhance", "trim", "both"], default="enhance")
+    parser.add_argument("--output-dir", default="batch_output")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--template", default="trimmedTemplate.pptx")
+    parser.add_argument("--score-cache", default="score_cache.sqlite3", help="shared score cache for trimming")
+    parser.add_argument("--image-cache", default="image_cache", help="shared image cache directory for enhancement")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rebuild slides that changed since the last run into the same output dir")
+    parser.add_argument("--trim-mode", choices=["stream", "subset", "rebuild"], default="stream",
+                        help="stream the kept slides out of the source, copy them raw without recompressing, "
+                             "or rebuild them on a blank deck (loses pictures)")
+    parser.add_argument("--scorer", choices=["llm", "local"], default="llm",
+                        help="score slides with the chat model or the offline BM25 scorer")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="overlap structuring, image fetching and layout slide by slide when enhancing")
+    parser.add_argument("--dedup-threshold", type=float, default=None,
+                        help="similarity at which near-duplicate slides share one score and one image "
+                             "(default: score and image every slide on its own)")
+    parser.add_argument("--summary", default="batch_summary.json")
+    args = parser.parse_args()
+
+    decks = find_decks(args.source)
+    if not decks:
+        print(f"❌ No decks found in: {args.source}")
+        return 1
+
+    print(f"📦 Processing {len(decks)} decks ({args.mode})...")
+    try:
+        summary = run_batch(decks, args.output_dir, args.mode, args.workers, args.template,
+                            args.score_cache, args.image_cache, args.incremental, args.trim_mode, args.scorer,
+                            args.pipelined, args.dedup_threshold)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    with open(args.summary, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"📊 {summary['succeeded']} succeeded, {summary['failed']} failed in {summary['total_seconds']}s")
+    print(f"📝 Summary saved as: {args.summary}")
+    return 0 if not summary["failed"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,77 @@
+try:
+    import tiktoken
+except ImportError:  # Optional; fall back to a character-based estimate
+    tiktoken = None
+
+
+class TokenEstimator:
+    """Count prompt tokens with tiktoken when installed, otherwise estimate them"""
+    CHARS_PER_TOKEN = 4  # Close for English prose; errs high for short words and numbers
+
+    def __init__(self, model="gpt-3.5-turbo"):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count(self, text):
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return -(-len(text) // self.CHARS_PER_TOKEN)
+
+    def truncate(self, text, max_tokens):
+        """Return text cut down to at most max_tokens tokens"""
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text)[:max_tokens])
+        return text[:max_tokens * self.CHARS_PER_TOKEN]
+
+
+class BatchPlanner:
+    """Pack slides, in arrival order, into scoring requests of at most max_slides that fit a token budget"""
+    def __init__(self, max_slides=5, token_budget=None, prompt_overhead=0, slide_overhead=6, estimator=None):
+        self.max_slides = max_slides
+        self.token_budget = token_budget
+        self.prompt_overhead = prompt_overhead  # The prompt without slides
+        self.slide_overhead = slide_overhead  # Each "Slide N:" header
+        self.estimator = estimator or TokenEstimator()
+        self.truncated = []  # Slides too long for a request of their own, cut to fit
+        self.batches = 0
+        self._batch = []
+        self._tokens = prompt_overhead
+
+        if token_budget is not None:
+            self.max_slide_tokens = token_budget - prompt_overhead - slide_overhead
+            if self.max_slide_tokens <= 0:
+                raise ValueError(f"token budget {token_budget} leaves no room for slides")
+
+    def add(self, index, text):
+        """Add a slide, returning the completed batch of (index, text) pairs it overflowed, or None"""
+        if self.token_budget is None:
+            self._batch.append((index, text))
+            return self.flush() if len(self._batch) >= self.max_slides else None
+
+        tokens = self.estimator.count(text)
+        if tokens > self.max_slide_tokens:
+            text = self.estimator.truncate(text, self.max_slide_tokens)
+            tokens = self.max_slide_tokens
+            self.truncated.append(index)
+
+        full = None
+        cost = tokens + self.slide_overhead
+        if self._batch and (self._tokens + cost > self.token_budget or len(self._batch) >= self.max_slides):
+            full = self.flush()
+        self._batch.append((index, text))
+        self._tokens += cost
+        return full
+
+    def flush(self):
+        """Return the batch being filled, or None if it is empty"""
+        if not self._batch:
+            return None
+        batch = self._batch
+        self._batch = []
+        self._tokens = self.prompt_overhead
+        self.batches += 1
+        return batch
@@ -0,0 +1,880 @@
+"""Benchmarks for the trimming and enhancement pipelines.
+
+Run every benchmark with ``python benchmark.py`` or pick some by name,
+e.g. ``python benchmark.py fade``. ``python benchmark.py suite`` times
+every stage of both pipelines on synthetic decks and writes the results
+to a JSON file, comparing them with a saved baseline to flag regressions.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+from io import BytesIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from PIL import Image
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.util import Inches
+
+from batch import run_batch
+from extraction import iter_slide_texts, load_deck
+from metrics import PipelineMetrics
+from main2 import DEFAULT_IMAGE_KEYWORDS, PowerPointProcessor
+# The golden fixtures are test code; the benchmark reuses them from the tests package next to it
+from tests.golden import LegacyStructuring, golden_slides, legacy_text_formatting
+
+
+# Descriptions of the equivalence checks that failed; any makes the script exit non-zero
+FAILED_CHECKS = []
+
+
+def _expect(ok, description):
+    """Record a failed equivalence check and return ok, for use inside the report line"""
+    if not ok:
+        FAILED_CHECKS.append(description)
+    return ok
+
+
+def _timed(func, *args, **kwargs):
+    """Run func once and return (result, seconds)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _traced(func, *args, **kwargs):
+    """Run func once and return (result, seconds, peak traced bytes)"""
+    tracemalloc.start()
+    try:
+        result, elapsed = _timed(func, *args, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def make_synthetic_deck(path, slide_count, seed=0, pictures=False):
+    """Write a deck of slide_count slides mixing bullet, table and prose content
+
+    With pictures, every slide also gets its own noise image, so the deck
+    is media-heavy and no two pictures are deduplicated.
+    """
+    rng = random.Random(seed)
+    words = ("revenue growth strategy market customer product team data analysis "
+             "process roadmap performance results quarter target risk plan").split()
+    prs = Presentation()
+    layout = prs.slide_layouts[1]
+    for i in range(slide_count):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {i + 1}: {' '.join(rng.sample(words, 3)).title()}"
+        kind = i % 3
+        if kind == 0:
+            body = "\n".join(f"• {' '.join(rng.sample(words, 5))}" for _ in range(rng.randint(3, 6)))
+        elif kind == 1:
+            body = "\n".join(f"{rng.choice(words)}\t{rng.randint(1, 999)}\t{rng.randint(1, 99)}.{rng.randint(0, 9)}%"
+                             for _ in range(rng.randint(3, 6)))
+        else:
+            body = " ".join(rng.choice(words) for _ in range(rng.randint(30, 80))) + "."
+        slide.placeholders[1].text_frame.text = body
+        if pictures:
+            buffer = BytesIO()
+            Image.effect_noise((640, 480), 20 + i % 200).convert("RGB").save(buffer, "PNG")
+            buffer.seek(0)
+            slide.shapes.add_picture(buffer, Inches(5), Inches(4), Inches(4))
+    prs.save(path)
+    return path
+
+
+def legacy_fade_mask(size, fade_fraction=0.15):
+    """The original per-pixel fade loop, kept as the reference implementation"""
+    mask = Image.new("L", size, 255)
+    fade_width = int(min(size) * fade_fraction)
+    for x in range(size[0]):
+        for y in range(size[1]):
+            distance_to_edge = min(x, y, size[0] - x, size[1] - y)
+            if distance_to_edge < fade_width:
+                fade = int(255 * (distance_to_edge / fade_width))
+                mask.putpixel((x, y), fade)
+    return mask
+
+
+def bench_fade():
+    """Compare the legacy fade loop against the mask builder"""
+    processor = PowerPointProcessor()
+    print("Edge fade mask")
+    for size in [(800, 600), (1024, 1024), (3840, 2160)]:
+        legacy, legacy_time = _timed(legacy_fade_mask, size)
+        fast, fast_time = _timed(processor._build_fade_mask, size)
+        identical = _expect(legacy.tobytes() == fast.tobytes(), f"fade mask {size[0]}x{size[1]} identical")
+        print(f"  {size[0]}x{size[1]}: legacy {legacy_time:.3f}s, "
+              f"new {fast_time:.4f}s ({legacy_time / fast_time:.0f}x), identical={identical}")
+
+
+def _legacy_extraction(path):
+    """How the deck used to be read: trimming parses it twice, enhancement once more"""
+    prs = Presentation(path)
+    texts = []
+    for slide in prs.slides:
+        text = ""
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text.strip():
+                text += shape.text.strip() + "\n"
+        texts.append(text.strip())
+    reopened = Presentation(path)
+    slides_content = []
+    for i, slide in enumerate(Presentation(path).slides):
+        slide_text = []
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text.strip():
+                slide_text.append(shape.text.strip())
+        slides_content.append({'slide_number': i + 1, 'content': slide_text})
+    return prs, reopened, texts, slides_content
+
+
+def _shared_extraction(path):
+    prs, records = load_deck(path)
+    processor = PowerPointProcessor()
+    texts = [record.text for record in records]
+    return prs, texts, processor.slides_content_from_records(records)
+
+
+def bench_extraction(slide_count=1000):
+    """Compare repeated deck parsing with the single-pass SlideRecord extraction"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_synthetic_deck(os.path.join(tmp, "deck.pptx"), slide_count)
+        print(f"Deck extraction ({slide_count} slides)")
+        legacy, legacy_time, legacy_peak = _traced(_legacy_extraction, path)
+        del legacy
+        shared, shared_time, shared_peak = _traced(_shared_extraction, path)
+        print(f"  legacy: {legacy_time:.2f}s, peak {legacy_peak / 2**20:.1f} MiB")
+        print(f"  shared: {shared_time:.2f}s, peak {shared_peak / 2**20:.1f} MiB")
+        streamed, streamed_time, streamed_peak = _traced(lambda: list(iter_slide_texts(path)))
+        matches = _expect(streamed == [record.texts for record in load_deck(path)[1]], "streamed texts match")
+        print(f"  streamed text only: {streamed_time:.2f}s, peak {streamed_peak / 2**20:.1f} MiB, matches={matches}")
+
+
+def bench_picture_reuse(slide_count=50):
+    """Time adding the same picture to many slides with and without memoization"""
+    image = Image.new("RGB", PowerPointProcessor.IMAGE_SIZE, "#3366aa")
+    print(f"Picture reuse ({slide_count} slides, one image)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, shared in [("fresh processor per slide", False), ("memoized", True)]:
+            processor = PowerPointProcessor()
+            prs = Presentation()
+
+            def add_all():
+                for _ in range(slide_count):
+                    slide = prs.slides.add_slide(prs.slide_layouts[6])
+                    (processor if shared else PowerPointProcessor())._add_image_to_slide(slide, image)
+
+            _, elapsed = _timed(add_all)
+            path = os.path.join(tmp, f"{shared}.pptx")
+            prs.save(path)
+            media = [n for n in zipfile.ZipFile(path).namelist() if n.startswith("ppt/media/")]
+            print(f"  {label}: {elapsed:.2f}s, {len(media)} media part(s), {os.path.getsize(path) / 1024:.0f} KiB")
+
+
+def bench_classifier(line_counts=(1000, 5000)):
+    """Check the text classifier against the legacy one and time it on long slides"""
+    legacy, current = LegacyStructuring(), PowerPointProcessor()
+    golden = golden_slides()
+    mismatches = sum(
+        1 for content in golden
+        if legacy._analyze_and_structure_text(content) != current._analyze_and_structure_text(content)
+    )
+    _expect(not mismatches, f"text classifier: {mismatches} golden mismatches")
+    print(f"Text classifier ({len(golden)} golden slides, {mismatches} mismatches)")
+    for line_count in line_counts:
+        # Un-bulleted notes ahead of the bullets are the legacy worst case
+        lines = (["Quarterly Review"] + [f"note {i} without a bullet" for i in range(line_count // 2)]
+                 + [f"• item {i}" for i in range(line_count // 2)])
+        content = ["\n".join(lines)]
+        old, legacy_time = _timed(legacy._analyze_and_structure_text, content)
+        new, new_time = _timed(current._analyze_and_structure_text, content)
+        print(f"  {line_count} lines: legacy {legacy_time:.3f}s, new {new_time:.4f}s "
+              f"({legacy_time / new_time:.0f}x), identical={_expect(old == new, f'classifier at {line_count} lines')}")
+
+
+def bench_formatting(sizes=(10_000, 100_000, 1_000_000)):
+    """Time the formatting tokenizer against the legacy splitter on large paragraphs"""
+    processor = PowerPointProcessor()
+    print("Text formatting runs")
+    for size in sizes:
+        words = ["revenue", "**grew**", "by", "**12%**", "this", "quarter"]
+        text = " ".join(words[i % len(words)] for i in range(size // 7))
+        old, legacy_time = _timed(legacy_text_formatting, text)
+        new, new_time = _timed(processor._process_text_formatting, text)
+        # The tokenizer drops the empty runs the legacy splitter emitted at markers
+        matches = _expect([run for run in old if run[0]] == new, f"formatting runs at {len(text)} chars")
+        print(f"  {len(text):>9} chars: legacy {legacy_time:.3f}s, new {new_time:.4f}s "
+              f"({legacy_time / new_time:.0f}x), matches={matches}")
+
+
+def bench_keywords(slide_count=2000, keyword_counts=(26, 300, 1000)):
+    """Compare per-keyword substring scans with the keyword automaton"""
+    rng = random.Random(2)
+    golden = golden_slides(slide_count)
+    print(f"Image keyword matching ({slide_count} slides)")
+    for keyword_count in keyword_counts:
+        keywords = list(DEFAULT_IMAGE_KEYWORDS)
+        while len(keywords) < keyword_count:
+            keywords.append("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(5, 10))))
+        processor = PowerPointProcessor(image_keywords=keywords)
+        contents = [processor._analyze_and_structure_text(content) for content in golden]
+
+        def legacy():
+            decisions = []
+            for content in contents:
+                text = str(content).lower()
+                matches = sum(1 for keyword in keywords if keyword in text)
+                decisions.append(content['type'] in ['table', 'bullet_list'] or matches >= 2)
+            return decisions
+
+        old, legacy_time = _timed(legacy)
+        new, new_time = _timed(processor.image_matcher.explain_many, contents)
+        identical = _expect(old == [need['needs_image'] for need in new],
+                            f"keyword decisions with {keyword_count} keywords")
+        print(f"  {keyword_count} keywords: legacy {legacy_time:.3f}s, matcher {new_time:.3f}s "
+              f"({legacy_time / new_time:.1f}x), identical={identical}")
+
+
+class FakeOpenAIServer:
+    """Local OpenAI-compatible server answering chat completions with canned scores.
+
+    Each request sleeps for `latency` seconds to stand in for the real API.
+    With throttle_every, every n-th request is refused with a 429 and a
+    Retry-After of retry_after seconds; once outage_after requests have
+    been answered, every later one fails with a 500. judge, if given,
+    scores each slide's text instead of the canned slide-number scores.
+    Point a client at it with ``OpenAI(base_url=server.base_url, api_key="test")``.
+    """
+    def __init__(self, latency=0.05, throttle_every=0, retry_after=0.05, outage_after=None, judge=None):
+        self.latency = latency
+        self.judge = judge
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.outage_after = outage_after
+        self.requests = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with server._lock:
+                    server.requests += 1
+                    number = server.requests
+                time.sleep(server.latency)
+                if server.outage_after is not None and number > server.outage_after:
+                    return self._send({"error": {"message": "outage", "type": "server_error"}}, 500)
+                if server.throttle_every and number % server.throttle_every == 0:
+                    return self._send({"error": {"message": "slow down", "type": "rate_limit"}}, 429,
+                                      {"Retry-After": str(server.retry_after)})
+                prompt = body["messages"][-1]["content"]
+                if server.judge:
+                    slides = re.findall(r"^Slide (\d+):\n(.*?)\n\n(?=Slide \d+:\n|Please rate)", prompt,
+                                        re.MULTILINE | re.DOTALL)
+                    content = "\n".join(f"Slide {n}: {server.judge(text)}" for n, text in slides)
+                else:
+                    slides = re.findall(r"^Slide (\d+):$", prompt, re.MULTILINE)
+                    content = "\n".join(f"Slide {n}: {int(n) * 7 % 10 + 1}" for n in slides)
+                self._send({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": content},
+                    }],
+                })
+
+            def _send(self, payload, status=200, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeImageServer:
+    """Local stand-in for the Unsplash search API and its image CDN.
+
+    GET /search/photos returns `results` entries whose URLs point back at
+    /images/<n>.jpg on the same server; both endpoints sleep for `latency`.
+    """
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.requests = 0
+        buffer = BytesIO()
+        Image.new("RGB", (1080, 720), "#3366aa").save(buffer, "JPEG")
+        image_bytes = buffer.getvalue()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                time.sleep(server.latency)
+                if self.path.startswith("/search/photos"):
+                    results = [{"urls": {"regular": f"{server.base_url}/images/{n}.jpg"}} for n in range(10)]
+                    self._send(json.dumps({"results": results}).encode(), "application/json")
+                else:
+                    self._send(image_bytes, "image/jpeg")
+
+            def _send(self, data, content_type):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _stub_processor(server, image_dir, **kwargs):
+    """A PowerPointProcessor whose Unsplash calls go to a FakeImageServer"""
+    processor = PowerPointProcessor(unsplash_api_key="test", image_dir=image_dir, **kwargs)
+    processor.unsplash_api_url = f"{server.base_url}/search/photos"
+    return processor
+
+
+def _import_main(base_url):
+    """Import main.py with its OpenAI client pointed at base_url"""
+    os.environ.setdefault("OPEN_AI", "test")
+    os.environ["OPENAI_BASE_URL"] = base_url
+    import main
+    main.client = main.OpenAI(api_key="test", base_url=base_url, max_retries=0)
+    return main
+
+
+def bench_scoring(slide_count=500):
+    """Measure scoring throughput against a fake API as concurrency grows"""
+    texts = [f"Slide {i} title\nSome body text about topic {i}" for i in range(slide_count)]
+    with FakeOpenAIServer(latency=0.05) as server:
+        main = _import_main(server.base_url)
+        print(f"Slide scoring ({slide_count} slides, 50ms fake API latency)")
+        reference = None
+        for concurrency in [1, 2, 4, 8, 16]:
+            scores, elapsed = _timed(
+                main.batch_score_slides, texts, batch_size=5,
+                concurrency=concurrency, requests_per_second=None,
+            )
+            reference = reference or scores
+            print(f"  concurrency {concurrency:>2}: {slide_count / elapsed:7.1f} slides/s, "
+                  f"deterministic={_expect(scores == reference, f'scores at concurrency {concurrency}')}")
+
+
+def bench_images(slide_count=40):
+    """Measure the image stage against a stub Unsplash as the worker pool grows"""
+    slides = [
+        {'slide_number': i + 1, 'needs_image': True,
+         'structured_content': {'type': 'bullet_list', 'title': f'Slide {i + 1}', 'points': []}}
+        for i in range(slide_count)
+    ]
+    print(f"Image acquisition ({slide_count} slides, 50ms stub latency)")
+    with FakeImageServer(latency=0.05) as server, tempfile.TemporaryDirectory() as tmp:
+        for workers in [1, 2, 4, 8, 16]:
+            processor = _stub_processor(server, os.path.join(tmp, str(workers)), image_workers=workers,
+                                        image_rate_limits={"unsplash": None})
+            result, elapsed = _timed(processor.generate_images_for_slides, [dict(s) for s in slides])
+            in_order = _expect(all(f"slide_{s['slide_number']}." in s['image_path'] for s in result),
+                               f"images in order with {workers} workers")
+            print(f"  workers {workers:>2}: {elapsed:.2f}s ({slide_count / elapsed:.1f} slides/s), in_order={in_order}")
+
+
+def bench_batch(deck_count=8, slide_count=150, workers=(1, 2, 4, 8)):
+    """Measure how batch trimming throughput scales with the worker count"""
+    with tempfile.TemporaryDirectory() as tmp:
+        decks = [make_synthetic_deck(os.path.join(tmp, f"deck{i}.pptx"), slide_count, seed=i)
+                 for i in range(deck_count)]
+        print(f"Batch trimming ({deck_count} decks of {slide_count} slides, local scorer, "
+              f"{os.cpu_count()} CPUs)")
+        baseline = None
+        for count in workers:
+            with contextlib.redirect_stdout(io.StringIO()):
+                summary, elapsed = _timed(run_batch, decks, os.path.join(tmp, f"out{count}"), mode="trim",
+                                          workers=count, scorer="local")
+            baseline = baseline or elapsed
+            speedup = baseline / elapsed
+            ok = _expect(summary["failed"] == 0, f"batch with {count} workers")
+            print(f"  workers {count:>2}: {elapsed:.2f}s ({deck_count / elapsed:.2f} decks/s), "
+                  f"{speedup:.2f}x, {speedup / count:.0%} efficiency, all_ok={ok}")
+
+
+def _intact_pictures(path):
+    """Count the pictures of a deck whose image part can still be loaded"""
+    intact = 0
+    for slide in Presentation(path).slides:
+        for shape in slide.shapes:
+            if shape.shape_type != MSO_SHAPE_TYPE.PICTURE:
+                continue
+            try:
+                shape.image.blob
+                intact += 1
+            except KeyError:
+                pass
+    return intact
+
+
+def bench_trim_writer(slide_count=200, keep_fraction=0.15):
+    """Compare rebuilding a trimmed deck with streaming its parts or subsetting the source package"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_synthetic_deck(os.path.join(tmp, "deck.pptx"), slide_count, pictures=True)
+        main = _import_main("http://127.0.0.1:9/v1")
+        keep_indices = list(range(0, slide_count, int(1 / keep_fraction)))
+        print(f"Trimmed deck writer ({slide_count} slides with pictures, "
+              f"{os.path.getsize(path) / 2**20:.0f} MiB, keeping {len(keep_indices)})")
+        for mode in ["rebuild", "stream", "subset"]:
+            output = os.path.join(tmp, f"{mode}.pptx")
+            _, elapsed, peak = _traced(main.build_trimmed_pptx, path, output, keep_indices, mode=mode)
+            print(f"  {mode}: {elapsed:.2f}s, peak {peak / 2**20:.1f} MiB, "
+                  f"{_intact_pictures(output)}/{len(keep_indices)} pictures intact, "
+                  f"{os.path.getsize(output) / 2**20:.1f} MiB")
+
+
+def bench_packing(slide_count=500):
+    """Compare fixed five-slide scoring batches with token-budget packing"""
+    rng = random.Random(3)
+    words = "revenue growth strategy market customer product team data analysis roadmap".split()
+    # Mostly short slides, a few long ones and one far past any budget
+    texts = [" ".join(rng.choice(words) for _ in range(rng.choice([8, 15, 30, 60, 400])))
+             for _ in range(slide_count - 1)] + ["appendix " * 20000]
+    with FakeOpenAIServer(latency=0.05) as server:
+        main = _import_main(server.base_url)
+        print(f"Scoring batch packing ({slide_count} slides, 50ms fake API latency)")
+        for label, batch_size, budget in [("fixed 5", 5, None),
+                                          (f"budget {main.SCORING_TOKEN_BUDGET}", main.SCORING_MAX_BATCH,
+                                           main.SCORING_TOKEN_BUDGET)]:
+            metrics = PipelineMetrics()
+            server.requests = 0
+            with contextlib.redirect_stdout(io.StringIO()):
+                scores, elapsed = _timed(main.batch_score_slides, texts, batch_size=batch_size, concurrency=4,
+                                         requests_per_second=None, metrics=metrics, token_budget=budget)
+            print(f"  {label}: {server.requests} requests, {elapsed:.2f}s, "
+                  f"{len(scores)}/{slide_count} scored, {metrics.counters.get('slides_truncated', 0)} truncated")
+
+
+def bench_resilience(slide_count=600):
+    """Score through throttling and an outage, then resume the outage run from its journal"""
+    texts = [f"Slide {i} title\nSome body text about topic {i}" for i in range(slide_count)]
+    print(f"Scoring resilience ({slide_count} slides)")
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()) as log:
+        with FakeOpenAIServer(latency=0.01, throttle_every=4, retry_after=0.05) as server:
+            main = _import_main(server.base_url)
+            metrics = PipelineMetrics()
+            scores, elapsed = _timed(main.batch_score_slides, texts, concurrency=4, requests_per_second=None,
+                                     metrics=metrics, backoff=main.Backoff(base_delay=0.05))
+        throttled = (len(scores), elapsed, metrics.counters.get("llm_retries", 0))
+
+        journal_path = os.path.join(tmp, "journal.jsonl")
+        with FakeOpenAIServer(latency=0.01, outage_after=60) as server:
+            main = _import_main(server.base_url)
+            journal = main.ScoreJournal(journal_path)
+            metrics = PipelineMetrics()
+            partial = main.batch_score_slides(texts, concurrency=4, requests_per_second=None, metrics=metrics,
+                                              journal=journal, backoff=main.Backoff(max_attempts=2, base_delay=0.01))
+        with FakeOpenAIServer(latency=0.01) as server:
+            main = _import_main(server.base_url)
+            resumed_metrics = PipelineMetrics()
+            resumed = main.batch_score_slides(texts, concurrency=4, requests_per_second=None,
+                                              metrics=resumed_metrics, journal=main.ScoreJournal(journal_path))
+            resumed_requests = server.requests
+    del log
+    print(f"  every 4th request throttled: {throttled[0]}/{slide_count} scored in {throttled[1]:.2f}s "
+          f"after {throttled[2]} retries")
+    print(f"  outage after 60 requests: {len(partial)}/{slide_count} scored, "
+          f"{metrics.counters.get('slides_unscored', 0)} left for the rerun")
+    print(f"  rerun: {len(resumed)}/{slide_count} scored, {resumed_metrics.counters.get('journal_hits', 0)} "
+          f"from the journal, {resumed_requests} requests")
+
+
+def _topic_judge(text):
+    """Stand-in for the model's judgement: slides dense in the deck's business topics score high"""
+    words = re.findall(r"[a-z]+", text.lower())
+    topical = sum(1 for word in words if word in {"revenue", "growth", "strategy", "market", "customer", "results"})
+    return max(1, min(10, 1 + round(9 * topical / max(1, len(words)) * 3)))
+
+
+def _rank_agreement(first, second, keep_fraction=0.15):
+    """Spearman correlation of two score lists and the overlap of their top keep_fraction"""
+    first, second = np.asarray(first, float), np.asarray(second, float)
+    ranks = [np.argsort(np.argsort(-scores, kind="stable"), kind="stable") for scores in (first, second)]
+    rho = np.corrcoef(ranks[0], ranks[1])[0, 1]
+    top_n = max(1, int(len(first) * keep_fraction))
+    tops = [set(np.argsort(-scores, kind="stable")[:top_n]) for scores in (first, second)]
+    return rho, len(tops[0] & tops[1]) / top_n
+
+
+def bench_scorers(slide_count=1000, local_sizes=(1000, 10000, 50000)):
+    """Compare LLM and local scorer throughput and how closely their rankings agree"""
+    from scorers import LocalScorer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_synthetic_deck(os.path.join(tmp, "deck.pptx"), slide_count)
+        texts = ["\n".join(slide) for slide in iter_slide_texts(path)]
+    print("Slide scorers")
+    for size in local_sizes:
+        # Larger inputs repeat the deck's slides; the scorer only sees text
+        corpus = (texts * (size // len(texts) + 1))[:size]
+        _, elapsed = _timed(LocalScorer().score, corpus)
+        print(f"  local, {size} slides: {elapsed:.3f}s ({size / elapsed:,.0f} slides/s)")
+    with FakeOpenAIServer(latency=0.05, judge=_topic_judge) as server:
+        main = _import_main(server.base_url)
+        with contextlib.redirect_stdout(io.StringIO()):
+            llm, elapsed = _timed(main.make_scorer("llm", concurrency=8, requests_per_second=None).score, texts)
+        print(f"  llm (stub, 50ms latency, 8 in flight), {slide_count} slides: {elapsed:.2f}s "
+              f"({slide_count / elapsed:,.0f} slides/s)")
+    local = LocalScorer().score(texts)
+    rho, overlap = _rank_agreement([score for _, score in llm], [score for _, score in local])
+    print(f"  agreement with the stub's topic-density judge: Spearman {rho:.2f}, top-15% overlap {overlap:.0%}")
+
+
+def bench_dedup(slide_count=2000, redundancy=0.3):
+    """Measure near-duplicate clustering speed and the scoring calls it saves"""
+    from dedup import cluster_near_duplicates
+    from scorers import DedupScorer
+
+    rng = random.Random(4)
+    words = ("revenue growth strategy market customer product team data analysis process roadmap "
+             "performance results quarter target risk plan hiring budget pipeline").split()
+    boilerplate = ["Agenda\nIntroduction\nMarket update\nResults\nNext steps", "Questions?",
+                   "Confidential - for internal use only\nDo not distribute",
+                   "Section divider\nThank you for your attention"]
+    texts = []
+    for i in range(slide_count):
+        if rng.random() < redundancy:
+            # Repeated boilerplate, sometimes with a stray edit
+            text = rng.choice(boilerplate)
+            texts.append(text + (f" {rng.choice(words)}" if rng.random() < 0.2 else ""))
+        else:
+            texts.append(f"Slide {i}\n" + " ".join(rng.choice(words) for _ in range(rng.randint(20, 60))))
+
+    print(f"Near-duplicate detection ({slide_count} slides, {redundancy:.0%} boilerplate)")
+    representatives, elapsed = _timed(cluster_near_duplicates, texts)
+    clusters = len(set(representatives))
+    print(f"  clustering: {elapsed:.2f}s ({slide_count / elapsed:,.0f} slides/s), {clusters} distinct slides")
+    with FakeOpenAIServer(latency=0.02) as server, contextlib.redirect_stdout(io.StringIO()):
+        main = _import_main(server.base_url)
+        results = {}
+        for label, deduplicate in [("every slide", False), ("deduplicated", True)]:
+            scorer = main.make_scorer("llm", concurrency=4, requests_per_second=None)
+            if deduplicate:
+                scorer = DedupScorer(scorer)
+            metrics = PipelineMetrics()
+            server.requests = 0
+            scores, elapsed = _timed(scorer.score, texts, metrics)
+            results[label] = (server.requests, len(scores), elapsed)
+    for label, (requests, scored, elapsed) in results.items():
+        print(f"  scoring {label}: {requests} API calls, {scored}/{slide_count} scored, {elapsed:.2f}s")
+
+
+def bench_selection(sizes=(10_000, 100_000, 1_000_000), keep_fraction=0.15, batch_size=25):
+    """Compare a full sort of every score against SlideSelector's bounded heap
+
+    Scores arrive in shuffled batches as they do from concurrent scoring.
+    The heap does its work as each batch lands, so what matters is how
+    long trimming waits after the last batch, reported separately from
+    the total work.
+    """
+    from selection import SlideSelector
+
+    print(f"Top-{keep_fraction:.0%} selection (scores arriving in batches of {batch_size})")
+    for size in sizes:
+        rng = random.Random(size)
+        # One-decimal scores, as the LLM returns, so ties are common
+        scores = [(i, rng.randint(0, 100) / 10) for i in range(size)]
+        batches = [scores[i:i + batch_size] for i in range(0, size, batch_size)]
+        rng.shuffle(batches)
+
+        collected = []
+        _, collect_time = _timed(lambda: [collected.extend(batch) for batch in batches])
+
+        def full_sort():
+            collected.sort(key=lambda x: x[1], reverse=True)
+            return sorted(idx for idx, _ in collected[:int(size * keep_fraction)])
+
+        selector = SlideSelector(size, top_percent=keep_fraction)
+        _, stream_time = _timed(lambda: [selector.add_many(batch) for batch in batches])
+        sorted_keep, sort_time = _timed(full_sort)
+        heap_keep, select_time = _timed(selector.select)
+        reference = sorted(idx for idx, _ in sorted(scores, key=lambda x: (-x[1], x[0]))[:len(heap_keep)])
+        print(f"  {size:>9,} slides: after the last batch full sort {sort_time * 1000:.0f} ms, "
+              f"heap {select_time * 1000:.1f} ms; total work {(collect_time + sort_time) * 1000:.0f} ms vs "
+              f"{(stream_time + select_time) * 1000:.0f} ms; "
+              f"same count={_expect(len(sorted_keep) == len(heap_keep), f'selection count at {size}')}, "
+              f"deterministic ties={_expect(heap_keep == reference, f'selection ties at {size}')}")
+
+
+def _deck_signature(path):
+    """Each slide's texts and picture sizes, to check two decks came out the same"""
+    return [
+        ([shape.text_frame.text for shape in slide.shapes if shape.has_text_frame],
+         [len(shape.image.blob) for shape in slide.shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE])
+        for slide in Presentation(path).slides
+    ]
+
+
+def bench_pipeline(slide_count=120, latencies=(0.01, 0.05), workers=8):
+    """Compare the sequential enhancement steps with the pipelined stage graph"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_synthetic_deck(os.path.join(tmp, "deck.pptx"), slide_count)
+        for latency in latencies:
+            print(f"Enhancement pipeline ({slide_count} slides, {latency * 1000:.0f}ms stub latency, "
+                  f"{workers} image workers)")
+            with FakeImageServer(latency=latency) as server:
+                signatures = {}
+                for pipelined in [False, True]:
+                    processor = _stub_processor(server, os.path.join(tmp, f"pics_{pipelined}"),
+                                                template_path=TEMPLATE_PATH, image_workers=workers,
+                                                image_rate_limits={"unsplash": None}, in_memory=True)
+                    output = os.path.join(tmp, f"enhanced_{pipelined}.pptx")
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        _, elapsed = _timed(processor.process_presentation, path, output, pipelined=pipelined)
+                    signatures[pipelined] = _deck_signature(output)
+                    report = processor.metrics.report()
+                    if not pipelined:
+                        steps = ", ".join(f"{name} {stage['wall_seconds']:.2f}s"
+                                          for name, stage in report['stages'].items()
+                                          if stage['wall_seconds'] >= 0.01)
+                        print(f"  sequential: {elapsed:.2f}s ({steps})")
+                        continue
+                    depths = ", ".join(f"{name} {stats['mean_depth']:.1f}/{stats['max_depth']}"
+                                       for name, stats in report['queues'].items())
+                    identical = _expect(signatures[True] == signatures[False],
+                                        f"pipelined deck identical at {latency * 1000:.0f}ms")
+                    print(f"  pipelined:  {elapsed:.2f}s, identical={identical}")
+                    print(f"    mean/max queue depth: {depths}")
+
+
+SUITE_SIZES = (10, 100, 1000, 5000)
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trimmedTemplate.pptx")
+# add_fade_to_edges works on single images, so it is timed on a fixed sample
+FADE_SAMPLE = 50
+# A stage this much slower than the baseline is reported as a regression
+REGRESSION_RATIO = 1.25
+
+
+def _suite_run(slide_count, tmp, openai_server, image_server):
+    """Time each pipeline stage on one synthetic deck and return the stage reports"""
+    metrics = PipelineMetrics(trace_memory=True)
+    path = make_synthetic_deck(os.path.join(tmp, f"deck_{slide_count}.pptx"), slide_count, seed=slide_count)
+    main = _import_main(openai_server.base_url)
+    processor = _stub_processor(image_server, os.path.join(tmp, "pics"), template_path=TEMPLATE_PATH,
+                                image_workers=8, image_rate_limits={"unsplash": None}, in_memory=True)
+    counts = {}
+
+    with metrics.stage("extract_slide_texts"):
+        texts = main.extract_slide_texts(Presentation(path))
+    counts["extract_slide_texts"] = len(texts)
+
+    with metrics.stage("batch_score_slides"):
+        scores = main.batch_score_slides(texts, batch_size=main.SCORING_MAX_BATCH, concurrency=8,
+                                         requests_per_second=None, metrics=metrics,
+                                         token_budget=main.SCORING_TOKEN_BUDGET)
+    counts["batch_score_slides"] = len(scores)
+
+    with metrics.stage("extract_text_from_pptx"):
+        slides_content = processor.extract_text_from_pptx(path)
+    counts["extract_text_from_pptx"] = len(slides_content)
+
+    with metrics.stage("structure_content"):
+        structured = processor.structure_content(slides_content)
+    counts["structure_content"] = len(structured)
+
+    with metrics.stage("generate_images_for_slides"):
+        imaged = processor.generate_images_for_slides(structured)
+    counts["generate_images_for_slides"] = sum(1 for slide in imaged if slide['needs_image'])
+
+    source = os.path.join(tmp, "fade_source.jpg")
+    Image.new("RGB", PowerPointProcessor.IMAGE_SIZE, "#3366aa").save(source, "JPEG")
+    fade_count = min(slide_count, FADE_SAMPLE)
+    with metrics.stage("add_fade_to_edges"):
+        for _ in range(fade_count):
+            processor.add_fade_to_edges(source, BytesIO())
+    counts["add_fade_to_edges"] = fade_count
+
+    with metrics.stage("create_presentation_from_template"):
+        processor.create_presentation_from_template(imaged, os.path.join(tmp, "enhanced.pptx"))
+    counts["create_presentation_from_template"] = len(imaged)
+
+    keep_indices = [idx for idx, _ in sorted(scores, key=lambda x: x[1], reverse=True)[:int(len(scores) * 0.15)]]
+    with metrics.stage("build_trimmed_pptx"):
+        main.build_trimmed_pptx(path, os.path.join(tmp, "trimmed.pptx"), keep_indices, mode="rebuild")
+    counts["build_trimmed_pptx"] = len(keep_indices)
+
+    with metrics.stage("write_trimmed_package"):
+        main.build_trimmed_pptx(path, os.path.join(tmp, "streamed.pptx"), keep_indices, mode="stream")
+    counts["write_trimmed_package"] = len(keep_indices)
+
+    with metrics.stage("subset_package"):
+        main.build_trimmed_pptx(path, os.path.join(tmp, "subset.pptx"), keep_indices, mode="subset")
+    counts["subset_package"] = len(keep_indices)
+
+    report = metrics.report()
+    stages = {}
+    for name, stage in report['stages'].items():
+        items = counts[name]
+        stages[name] = {
+            "items": items,
+            "wall_seconds": round(stage['wall_seconds'], 4),
+            "cpu_seconds": round(stage['cpu_seconds'], 4),
+            "items_per_second": round(items / stage['wall_seconds'], 1) if stage['wall_seconds'] else None,
+            "peak_heap_bytes": stage.get('peak_heap_bytes'),
+        }
+    return {
+        "slides": slide_count,
+        "deck_bytes": os.path.getsize(path),
+        "stages": stages,
+        "counters": report['counters'],
+        "peak_rss_bytes": report['peak_rss_bytes'],
+    }
+
+
+def compare_to_baseline(results, baseline, ratio=REGRESSION_RATIO):
+    """Return (size, stage, old, new) for each stage slower than ratio x its baseline time"""
+    regressions = []
+    for size, run in results['runs'].items():
+        old_run = baseline.get('runs', {}).get(size)
+        if not old_run:
+            continue
+        for name, stage in run['stages'].items():
+            old = old_run['stages'].get(name)
+            # Ignore stages too quick to time reliably
+            if old and old['wall_seconds'] >= 0.25 and stage['wall_seconds'] > old['wall_seconds'] * ratio:
+                regressions.append((size, name, old['wall_seconds'], stage['wall_seconds']))
+    return regressions
+
+
+def bench_suite(sizes=SUITE_SIZES, output_path="benchmark_results.json", baseline_path="benchmark_baseline.json"):
+    """Time every stage of both pipelines over synthetic decks and check against the baseline
+
+    Scoring runs against a zero-latency FakeOpenAIServer and images against
+    a zero-latency FakeImageServer, so the numbers are the pipeline's own
+    cost. Timings are taken with tracemalloc running to record each
+    stage's heap peak. The results go to output_path; the first run also
+    saves them as the baseline that later runs are compared with.
+    """
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": {},
+    }
+    print(f"Benchmark suite ({', '.join(str(size) for size in sizes)} slides)")
+    with FakeOpenAIServer(latency=0) as openai_server, FakeImageServer(latency=0) as image_server:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+                run = _suite_run(size, tmp, openai_server, image_server)
+            results["runs"][str(size)] = run
+            print(f"  {size} slides:")
+            for name, stage in run["stages"].items():
+                print(f"    {name:<34} {stage['wall_seconds']:8.3f}s  {stage['items_per_second'] or 0:9.1f}/s  "
+                      f"heap {stage['peak_heap_bytes'] / 2**20:7.1f} MiB")
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"📝 Results saved as: {output_path}")
+
+    if not os.path.exists(baseline_path):
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"📌 No baseline yet, saved this run as: {baseline_path}")
+        return results
+
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline)
+    for size, name, old, new in regressions:
+        print(f"⚠️ {name} ({size} slides): {old:.3f}s -> {new:.3f}s ({new / old:.2f}x)")
+    if not regressions:
+        print(f"✅ No stage slower than {REGRESSION_RATIO}x the baseline ({baseline_path})")
+    results["regressions"] = len(regressions)
+    return results
+
+
+BENCHMARKS = {
+    "fade": bench_fade,
+    "scoring": bench_scoring,
+    "extraction": bench_extraction,
+    "images": bench_images,
+    "batch": bench_batch,
+    "picture_reuse": bench_picture_reuse,
+    "classifier": bench_classifier,
+    "formatting": bench_formatting,
+    "keywords": bench_keywords,
+    "trim_writer": bench_trim_writer,
+    "packing": bench_packing,
+    "resilience": bench_resilience,
+    "scorers": bench_scorers,
+    "dedup": bench_dedup,
+    "selection": bench_selection,
+    "pipeline": bench_pipeline,
+    "suite": bench_suite,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the trimming and enhancement pipelines")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in SUITE_SIZES),
+                        help="comma-separated deck sizes for the suite")
+    parser.add_argument("--output", default="benchmark_results.json", help="where the suite writes its results")
+    parser.add_argument("--baseline", default="benchmark_baseline.json", help="suite results to compare against")
+    args = parser.parse_args()
+
+    for name in args.names or list(BENCHMARKS):
+        if name not in BENCHMARKS:
+            print(f"❌ Unknown benchmark: {name} (choose from {', '.join(BENCHMARKS)})")
+            sys.exit(1)
+        if name == "suite":
+            sizes = [int(size) for size in args.sizes.split(",")]
+            results = bench_suite(sizes, args.output, args.baseline)
+            if results.get("regressions"):
+                sys.exit(1)
+        else:
+            BENCHMARKS[name]()
+    if FAILED_CHECKS:
+        print(f"❌ {len(FAILED_CHECKS)} equivalence check(s) failed: {'; '.join(FAILED_CHECKS)}")
+        sys.exit(1)
@@ -0,0 +1,83 @@
+import hashlib
+import re
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r"\w+")
+# Largest prime below 2**32, so (a * x + b) stays inside uint64 for 32-bit x
+_PRIME = np.uint64(4294967291)
+
+
+class NearDuplicateIndex:
+    """Streaming MinHash/LSH index mapping each slide to the earlier slide it nearly duplicates"""
+    def __init__(self, threshold=0.9, num_perm=64, bands=16, shingle_size=3, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), num_perm, dtype=np.uint64)
+        self._buckets = [{} for _ in range(bands)]
+        self._signatures = {}
+        self._exact = {}
+        self.representatives = []
+
+    def _shingles(self, words):
+        if len(words) <= self.shingle_size:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text):
+        """Return the MinHash signature of a text's word shingles"""
+        words = WORD_PATTERN.findall(text.lower())
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+             for shingle in self._shingles(words)),
+            dtype=np.uint64,
+        )
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def add(self, text):
+        """Index the next slide's text and return its representative's index"""
+        # The representative is the first earlier slide whose estimated shingle Jaccard similarity
+        # reaches threshold, or the slide itself. Identical normalized text skips hashing
+        index = len(self.representatives)
+        key = " ".join(text.lower().split())
+        representative = self._exact.get(key)
+        if representative is None:
+            signature = self.signature(text)
+            bands = [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+            # Only slides sharing a band bucket are compared, so a deck clusters in about linear time
+            candidates = set()
+            for buckets, band in zip(self._buckets, bands):
+                candidates.update(buckets.get(band, ()))
+            for candidate in sorted(candidates):
+                if np.mean(self._signatures[candidate] == signature) >= self.threshold:
+                    representative = candidate
+                    break
+            else:
+                # Only representatives are indexed, so clusters cannot drift along a chain of edits
+                representative = index
+                self._signatures[index] = signature
+                for buckets, band in zip(self._buckets, bands):
+                    buckets.setdefault(band, []).append(index)
+            self._exact[key] = representative
+        self.representatives.append(representative)
+        return representative
+
+    @property
+    def duplicates(self):
+        """How many of the added slides have an earlier representative"""
+        return sum(1 for i, representative in enumerate(self.representatives) if representative != i)
+
+
+def cluster_near_duplicates(texts, threshold=0.9, **kwargs):
+    """Return the representative index of every text, as NearDuplicateIndex.add gives it"""
+    index = NearDuplicateIndex(threshold, **kwargs)
+    for text in texts:
+        index.add(text)
+    return index.representatives
@@ -0,0 +1,120 @@
+import posixpath
+import zipfile
+from typing import NamedTuple
+
+from lxml import etree
+from pptx import Presentation
+from pptx.shapes.picture import Picture
+
+
+_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+class SlideRecord(NamedTuple):
+    """Everything the pipelines need from one slide, read in a single pass"""
+    slide_number: int
+    texts: tuple        # stripped, non-empty text of each shape in order
+    shape_count: int
+    placeholders: tuple  # (idx, type) of each placeholder shape
+    pictures: tuple     # SHA1 of each picture's image (None if linked); empty unless hashed
+
+    @property
+    def text(self):
+        return "\n".join(self.texts)
+
+
+def _picture_sha1(picture):
+    """SHA1 of a picture's embedded image, or None when the image is only linked"""
+    try:
+        return picture.image.sha1
+    except ValueError:
+        return None
+
+
+def extract_slides(prs, hash_pictures=False):
+    """Walk every shape of a Presentation once and return its SlideRecords"""
+    records = []
+    for i, slide in enumerate(prs.slides):
+        texts = []
+        placeholders = []
+        pictures = []
+        shape_count = 0
+        for shape in slide.shapes:
+            shape_count += 1
+            if hasattr(shape, "text"):
+                text = shape.text.strip()
+                if text:
+                    texts.append(text)
+            if shape.is_placeholder:
+                placeholder = shape.placeholder_format
+                placeholders.append((placeholder.idx, placeholder.type))
+            if hash_pictures and isinstance(shape, Picture):
+                pictures.append(_picture_sha1(shape))
+        records.append(SlideRecord(i + 1, tuple(texts), shape_count, tuple(placeholders), tuple(pictures)))
+    return records
+
+
+def load_deck(path):
+    """Parse a .pptx once, returning the Presentation and its SlideRecords"""
+    prs = Presentation(path)
+    return prs, extract_slides(prs)
+
+
+def _slide_part_names(package):
+    """Return the slide part names of an opened .pptx zip in presentation order"""
+    rels = etree.fromstring(package.read("ppt/_rels/presentation.xml.rels"))
+    targets = {}
+    for rel in rels.iter(_PKG_REL + "Relationship"):
+        target = rel.get("Target")
+        if target.startswith("/"):
+            targets[rel.get("Id")] = target.lstrip("/")
+        else:
+            targets[rel.get("Id")] = posixpath.normpath(posixpath.join("ppt", target))
+    presentation = etree.fromstring(package.read("ppt/presentation.xml"))
+    return [targets[sld_id.get(_R + "id")] for sld_id in presentation.iter(_P + "sldId")]
+
+
+def _shape_text(sp):
+    """Text of a p:sp element, formed the way python-pptx's Shape.text is"""
+    tx_body = sp.find(_P + "txBody")
+    if tx_body is None:
+        return ""
+    paragraphs = []
+    for p in tx_body.iterchildren(_A + "p"):
+        parts = []
+        for child in p.iterchildren(_A + "r", _A + "br", _A + "fld"):
+            if child.tag == _A + "br":
+                parts.append("\v")
+            else:
+                parts.append(child.findtext(_A + "t") or "")
+        paragraphs.append("".join(parts))
+    return "\n".join(paragraphs)
+
+
+def iter_slide_texts(path):
+    """Yield each slide's shape texts, matching SlideRecord.texts, straight from the slide XML"""
+    # The python-pptx object model is never built; each slide part is streamed with iterparse
+    with zipfile.ZipFile(path) as package:
+        for name in _slide_part_names(package):
+            texts = []
+            with package.open(name) as part:
+                for _, elm in etree.iterparse(part, events=("end",)):
+                    parent = elm.getparent()
+                    if parent is None or parent.tag != _P + "spTree":
+                        continue
+                    # Only top-level shapes count, as with slide.shapes
+                    if elm.tag == _P + "sp":
+                        text = _shape_text(elm).strip()
+                        if text:
+                            texts.append(text)
+                    elm.clear()
+            yield tuple(texts)
+
+
+def count_slides(path):
+    """Number of slides in a .pptx, read from presentation.xml alone"""
+    with zipfile.ZipFile(path) as package:
+        return len(_slide_part_names(package))
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import random
+import tempfile
+import threading
+
+
+class ImageCache:
+    """Persistent LRU cache of processed slide images, keyed by provider, prompt and size"""
+    def __init__(self, directory="image_cache", max_bytes=500 * 2**20, max_variants=3, choice="rotate"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_variants = max_variants  # Distinct images per query, so slides don't all share one
+        self.choice = choice  # "rotate" (by slide number), "random" or "first"
+        self.hits = 0
+        self.misses = 0
+        self.bytes_stored = 0
+        self._total_bytes = None  # Size of the cache directory, counted on the first put
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, provider, prompt, size):
+        payload = f"{provider}\0{prompt}\0{size[0]}x{size[1]}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _query_dir(self, provider, prompt, size):
+        return os.path.join(self.directory, self.key(provider, prompt, size))
+
+    def variant_id(self, source_id):
+        """Return the stored id for a provider-side image id (or URL)"""
+        return hashlib.sha1(str(source_id).encode("utf-8")).hexdigest()[:16]
+
+    def variants(self, provider, prompt, size):
+        """Return the variant ids stored for a query"""
+        try:
+            names = os.listdir(self._query_dir(provider, prompt, size))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-4] for name in names if name.endswith(".jpg"))
+
+    def choose(self, provider, prompt, size, slide_number=0):
+        """Return the JPEG bytes of a cached variant, or None on a miss"""
+        # Only a query holding all its variants is a hit, so the first decks still collect a varied set
+        variants = self.variants(provider, prompt, size)
+        if len(variants) < self.max_variants:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if self.choice == "random":
+            variant = random.choice(variants)
+        elif self.choice == "first":
+            variant = variants[0]
+        else:
+            variant = variants[slide_number % len(variants)]
+
+        path = os.path.join(self._query_dir(provider, prompt, size), f"{variant}.jpg")
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            # Evicted by another process in the meantime
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, provider, prompt, size, variant, data):
+        """Store the processed JPEG bytes of one variant"""
+        query_dir = self._query_dir(provider, prompt, size)
+        os.makedirs(query_dir, exist_ok=True)
+        path = os.path.join(query_dir, f"{self.variant_id(variant)}.jpg")
+        if self._total_bytes is None:
+            self.evict()
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+        # Written atomically, so several processes can share one directory
+        fd, tmp_path = tempfile.mkstemp(dir=query_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.bytes_stored += len(data)
+            self._total_bytes += len(data) - replaced
+            over = self._total_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used images until the cache fits in max_bytes"""
+        # The walk also recounts put()'s running total, which misses other processes' files
+        files = []
+        total = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".jpg"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._total_bytes = total
+
+    def stats(self):
+        """Return hit/miss counters and the hit rate"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_stored": self.bytes_stored,
+        }
@@ -3,63 +3,219 @@ print(sys.executable)
 
 import os
 
-import time
+from concurrent.futures import ThreadPoolExecutor
 from pptx import Presentation
 from openai import OpenAI
 from dotenv import load_dotenv  # Add this import
+from score_cache import ScoreCache
+from rate_limit import Backoff, TokenBucket
+from metrics import PipelineMetrics
+from score_journal import ScoreJournal
+from scorers import DedupScorer, LocalScorer, SlideScorer
+from extraction import count_slides, extract_slides, iter_slide_texts
+from trim_writer import subset_package, write_trimmed_package
+from batch_planner import BatchPlanner, TokenEstimator
+from selection import SlideSelector
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Get API key from environment variable
-client = OpenAI(api_key=os.getenv("OPEN_AI"))
+# Get API key from environment variable; retries are left to score_batch's Backoff.
+# Without a key only the local scorer can be used.
+client = OpenAI(api_key=os.getenv("OPEN_AI"), max_retries=0) if os.getenv("OPEN_AI") else None
+
+SCORING_MODEL = "gpt-3.5-turbo"
+# Bump whenever build_score_prompt changes so cached scores are not reused
+SCORING_PROMPT_VERSION = 1
+# Prompt tokens per scoring request and the most slides packed into one
+SCORING_TOKEN_BUDGET = 2000
+SCORING_MAX_BATCH = 25
 
 def extract_slide_texts(prs):
+    return [record.text for record in extract_slides(prs)]
+
+def build_score_prompt(batch):
+    prompt = "Here are some presentation slides:\n\n"
+    for j, text in enumerate(batch):
+        prompt += f"Slide {j+1}:\n{text}\n\n"
+    prompt += (
+        "Please rate each slide on a scale of 1 to 10 based on importance. "
+        "Only return in this format:\nSlide 1: 8\nSlide 2: 5\n..."
+    )
+    return prompt
+
+def parse_scores(content, indices):
+    """Map "Slide N: score" lines back to the real slide indices of the batch"""
+    scores = {}
+    for line in content.splitlines():
+        if "Slide" in line and ":" in line:
+            try:
+                slide_num = int(line.split(":")[0].strip().split(" ")[-1]) - 1
+                score = int(line.split(":")[1].strip())
+                # A repeated slide keeps its first score, so it cannot stand in for a missing one
+                if 0 <= slide_num < len(indices) and indices[slide_num] not in scores:
+                    scores[indices[slide_num]] = score
+            except:
+                continue
+    return list(scores.items())
+
+def score_batch(batch, indices, limiter=None, metrics=None, backoff=None):
+    """Score one batch, retrying throttling and server errors with backoff"""
+    backoff = backoff or Backoff()
+
+    def request():
+        if limiter:
+            limiter.acquire()
+        if metrics:
+            metrics.increment("llm_calls")
+        return client.chat.completions.create(
+            model=SCORING_MODEL,
+            messages=[{"role": "user", "content": build_score_prompt(batch)}],
+            temperature=0.2,
+        )
+
+    def on_retry(attempt, error, delay):
+        # Runs on a worker thread: one write per line keeps it whole among other batches' output
+        print(f"🔁 Batch {indices[0]}-{indices[-1]+1} failed ({error}), retrying in {delay:.1f}s\n", end="")
+        if metrics:
+            metrics.increment("llm_retries")
+
+    try:
+        response = backoff.call(request, on_retry=on_retry)
+        return parse_scores(response.choices[0].message.content, indices)
+    except Exception as e:
+        print(f"❌ Error on batch {indices[0]}-{indices[-1]+1}: {e}\n", end="")
+        if metrics:
+            metrics.increment("llm_errors")
+        return []
+
+def batch_score_slides(slide_texts, batch_size=5, concurrency=1, requests_per_second=1 / 1.2, cache=None,
+                       metrics=None, token_budget=None, journal=None, backoff=None, sink=None):
+    """Score slides in batches of up to batch_size, keeping up to `concurrency` requests in flight"""
     texts = []
-    for slide in prs.slides:
-        text = ""
-        for shape in slide.shapes:
-            if hasattr(shape, "text") and shape.text.strip():
-                text += shape.text.strip() + "\n"
-        texts.append(text.strip())
-    return texts
-
-def batch_score_slides(slide_texts, batch_size=5):
     indexed_scores = []
-    for i in range(0, len(slide_texts), batch_size):
-        print("Processing batch:", i)
-        batch = slide_texts[i:i+batch_size]
-        prompt = "Here are some presentation slides:\n\n"
-        for j, text in enumerate(batch):
-            prompt += f"Slide {j+1}:\n{text}\n\n"
-        prompt += (
-            "Please rate each slide on a scale of 1 to 10 based on importance. "
-            "Only return in this format:\nSlide 1: 8\nSlide 2: 5\n..."
-        )
+    limiter = TokenBucket(requests_per_second) if requests_per_second else None  # None disables pacing
+    estimator = TokenEstimator(SCORING_MODEL)
+    planner = BatchPlanner(batch_size, token_budget, estimator.count(build_score_prompt([])), estimator=estimator)
+
+    def run(batch):
+        indices = [i for i, _ in batch]
+        scores = score_batch([text for _, text in batch], indices, limiter, metrics, backoff)
+        if journal is not None and scores:
+            journal.record([i for i, _ in scores], [texts[i] for i, _ in scores], [score for _, score in scores])
+        if cache is not None:
+            cache.put_many((texts[i], score) for i, score in scores)
+        if sink:
+            sink(scores)  # Called from worker threads as each batch finishes
+        return scores
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = []
+        arrived = []
+
+        def submit(batch):
+            # Printed here rather than in score_batch, so lines from concurrent batches don't interleave
+            print("Processing batch:", batch[0][0])
+            futures.append(executor.submit(run, batch))
+
+        def collect(indices):
+            # Look arrivals up in the journal and cache, then send out every full batch
+            if journal is not None:
+                resumed = [(i, journal.get(texts[i])) for i in indices]
+                resumed = [(i, score) for i, score in resumed if score is not None]
+                indexed_scores.extend(resumed)
+                if sink and resumed:
+                    sink(resumed)
+                done = {i for i, _ in resumed}
+                indices = [i for i in indices if i not in done]
+                if metrics:
+                    metrics.increment("journal_hits", len(resumed))
+            if cache is not None:
+                cached = cache.get_many([texts[i] for i in indices])
+                hits = [(indices[j], score) for j, score in cached.items()]
+                indexed_scores.extend(hits)
+                if sink and hits:
+                    sink(hits)
+                indices = [i for j, i in enumerate(indices) if j not in cached]
+                if metrics:
+                    metrics.increment("score_cache_hits", len(cached))
+                    metrics.increment("score_cache_misses", len(indices))
+            for i in indices:
+                batch = planner.add(i, texts[i])
+                if batch:
+                    submit(batch)
 
-        try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2,
-            )
-            content = response.choices[0].message.content
-            for line in content.splitlines():
-                if "Slide" in line and ":" in line:
-                    try:
-                        slide_num = int(line.split(":")[0].strip().split(" ")[-1]) - 1
-                        score = int(line.split(":")[1].strip())
-                        real_index = i + slide_num
-                        indexed_scores.append((real_index, score))
-                    except:
-                        continue
-        except Exception as e:
-            print(f"❌ Error on batch {i}-{i+batch_size}: {e}")
-            continue
-        time.sleep(1.2)
+        for text in slide_texts:
+            texts.append(text)
+            arrived.append(len(texts) - 1)
+            if len(arrived) == batch_size:
+                collect(arrived)
+                arrived = []
+        collect(arrived)
+        batch = planner.flush()
+        if batch:
+            submit(batch)
+
+        # Batches finish in any order; the sort below restores slide order
+        for future in futures:
+            indexed_scores.extend(future.result())
+
+    if planner.truncated:
+        print(f"✂️ Truncated {len(planner.truncated)} long slides to fit the token budget: "
+              f"{', '.join(str(i + 1) for i in planner.truncated)}")
+    indexed_scores.sort(key=lambda x: x[0])
+    scored = len({i for i, _ in indexed_scores})
+    unscored = len(texts) - scored
+    if unscored:
+        print(f"⚠️ {unscored} slides could not be scored; rerun to retry them")
+    if metrics:
+        metrics.increment("slides_scored", scored)
+        metrics.increment("slides_truncated", len(planner.truncated))
+        metrics.increment("slides_unscored", unscored)
     return indexed_scores
 
-def build_trimmed_pptx(input_path, output_path, keep_indices):
+class LLMScorer(SlideScorer):
+    """Scores slides by asking the chat model, through batch_score_slides"""
+    name = "llm"
+    resumable = True
+
+    def __init__(self, cache=None, concurrency=4, requests_per_second=3, backoff=None):
+        self.cache = cache
+        self.concurrency = concurrency
+        self.requests_per_second = requests_per_second
+        self.backoff = backoff
+
+    def score(self, slide_texts, metrics=None, journal=None, sink=None):
+        if client is None:
+            raise RuntimeError("OPEN_AI is not set; use the local scorer to trim offline")
+        scores = batch_score_slides(
+            slide_texts, batch_size=SCORING_MAX_BATCH, concurrency=self.concurrency,
+            requests_per_second=self.requests_per_second, cache=self.cache, metrics=metrics,
+            token_budget=SCORING_TOKEN_BUDGET, journal=journal, backoff=self.backoff, sink=sink,
+        )
+        if self.cache is not None:
+            stats = self.cache.stats()
+            print(f"🗃️ Score cache: {stats['hits']} hits, {stats['misses']} misses")
+        return scores
+
+def make_scorer(name="llm", cache=None, **kwargs):
+    """Return the scorer backend called name ("llm" or "local"); cache and kwargs are for the LLM"""
+    if name == "llm":
+        return LLMScorer(cache, **kwargs)
+    if name == "local":
+        return LocalScorer()
+    raise ValueError(f"unknown scorer: {name}")
+
+def build_trimmed_pptx(input_path, output_path, keep_indices, mode="stream"):
+    """Save the slides at keep_indices to output_path"""
+    # "stream" copies the kept slides' parts out of the source, "subset" does the same without
+    # recompressing, and "rebuild" re-inserts shapes on blank slides, losing pictures and theme
+    if mode == "stream":
+        return write_trimmed_package(input_path, output_path, keep_indices)
+    if mode == "subset":
+        return subset_package(input_path, output_path, keep_indices)
+    if mode != "rebuild":
+        raise ValueError(f"unknown trim mode: {mode}")
     original = Presentation(input_path)
     trimmed = Presentation()
     blank_layout = trimmed.slide_layouts[6]
@@ -75,6 +231,49 @@ def build_trimmed_pptx(input_path, output_path, keep_indices):
                 continue
     trimmed.save(output_path)
 
+def trim_presentation(input_file, output_file, keep_fraction=0.15, cache=None, concurrency=4, requests_per_second=3,
+                      metrics=None, trim_mode="stream", journal_path=None, allow_partial=False, scorer=None,
+                      dedup_threshold=None, selector=None):
+    """Score every slide of input_file and save the top keep_fraction to output_file"""
+    metrics = metrics or PipelineMetrics()
+    scorer = scorer or LLMScorer(cache, concurrency, requests_per_second)
+    # Slides similar to an earlier one share its score instead of being scored again
+    if dedup_threshold is not None:
+        scorer = DedupScorer(scorer, dedup_threshold)
+    # Finished batches are checkpointed, so a rerun only scores what is missing
+    journal = None
+    if scorer.resumable:
+        journal = ScoreJournal(journal_path or f"{output_file}.journal.jsonl", model=SCORING_MODEL,
+                               prompt_version=SCORING_PROMPT_VERSION)
+        if journal.batches:
+            print(f"♻️ Resuming from {journal.path} ({len(journal.scores)} slides already scored)")
+    print("📥 Reading PPTX...")
+    total = count_slides(input_file)
+    selector = selector or SlideSelector(total, top_percent=keep_fraction)  # Fed as batches finish
+    texts = ("\n".join(slide) for slide in iter_slide_texts(input_file))
+
+    print(f"🤖 Scoring slides with the {scorer.name} scorer...")
+    # Extraction is streamed into scoring, so the two share one stage
+    unscored_before = metrics.counters.get("slides_unscored", 0)
+    with metrics.stage("scoring"):
+        scorer.score(texts, metrics=metrics, journal=journal, sink=selector.add_many)
+    unscored = metrics.counters.get("slides_unscored", 0) - unscored_before
+    if unscored and not allow_partial:  # allow_partial trims from the slides that were scored
+        resume = f"; rerun to resume from {journal.path}" if journal is not None else ""
+        raise RuntimeError(f"{unscored} slides could not be scored{resume}")
+
+    with metrics.stage("selection"):
+        keep_indices = selector.select()
+
+    print(f"✂️ Keeping {len(keep_indices)} out of {total} slides...")
+    with metrics.stage("build_trimmed"):
+        build_trimmed_pptx(input_file, output_file, keep_indices, mode=trim_mode)
+    # Keep the checkpoint while any slide is unscored so a rerun can still resume from it
+    if journal is not None and not unscored:
+        journal.remove()
+    print(metrics.summary())
+    return output_file
+
 def main():
     input_file = "orignal.pptx"
     output_file = "trimmed_output_15percent.pptx"
@@ -83,20 +282,23 @@ def main():
         print(f"❌ File not found: {input_file}")
         return
 
-    print("📥 Reading PPTX...")
-    prs = Presentation(input_file)
-    texts = extract_slide_texts(prs)
-
-    print("🤖 Scoring slides using GPT-3.5-turbo...")
-    scores = batch_score_slides(texts, batch_size=5)
-
-    print("📊 Selecting top 15%...")
-    scores.sort(key=lambda x: x[1], reverse=True)
-    top_n = int(len(scores) * 0.15)
-    keep_indices = [idx for idx, _ in scores[:top_n]]
-
-    print(f"✂️ Keeping {top_n} out of {len(scores)} slides...")
-    build_trimmed_pptx(input_file, output_file, keep_indices)
+    # SLIDE_SCORER=local ranks slides offline instead of calling the API
+    scorer_name = os.getenv("SLIDE_SCORER", "llm")
+    cache = None
+    if scorer_name == "llm":
+        cache = ScoreCache("score_cache.sqlite3", model=SCORING_MODEL, prompt_version=SCORING_PROMPT_VERSION)
+    scorer = make_scorer(scorer_name, cache=cache)
+    # SLIDE_DEDUP_THRESHOLD=0.9 lets near-duplicate slides share one score
+    dedup_threshold = os.getenv("SLIDE_DEDUP_THRESHOLD")
+    dedup_threshold = float(dedup_threshold) if dedup_threshold else None
+    metrics = PipelineMetrics()
+    try:
+        trim_presentation(input_file, output_file, metrics=metrics, scorer=scorer, dedup_threshold=dedup_threshold)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return
+    finally:
+        metrics.to_json("trim_metrics.json")
 
     print(f"✅ Done! Trimmed PPTX saved as: {output_file}")
 
@@ -6,23 +6,188 @@ from pptx.enum.text import PP_ALIGN, MSO_ANCHOR, MSO_AUTO_SIZE
 from pptx.enum.shapes import MSO_SHAPE_TYPE
 from pptx.dml.color import RGBColor
 from openai import OpenAI
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageChops, ImageDraw, ImageFilter, ImageFont
 import requests
 from io import BytesIO
 import json
 import random
 from dotenv import load_dotenv
+from extraction import extract_slides, iter_slide_texts, load_deck
+from rate_limit import TokenBucket
+from image_cache import ImageCache
+from template_index import TemplateIndex, placeholder_roles
+from metrics import PipelineMetrics
+from dedup import NearDuplicateIndex, cluster_near_duplicates
+from pipeline import StagePipeline
 import shutil
-from PIL import Image, ImageDraw, ImageFilter
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
 # Load environment variables
 load_dotenv()
 
+# Compiled once: any of tab-, pipe-separated, colon-number pairs or percentages
+TABULAR_PATTERN = re.compile(r'\t.*\t|\|.*\||:\s*\d+|\d+\.\d+%')
+# Bullet symbols, numbered lists or letter lists at the start of a stripped line
+BULLET_PATTERN = re.compile(r'[\•\-\*]\s|\d+\.\s|[a-zA-Z]\.\s')
+# Escaped asterisk, bold marker, `code` span or a closed *italic* span
+FORMATTING_PATTERN = re.compile(r'\\\*|\*\*|`([^`\n]*)`|\*(?=[^\s*])([^*\n]*?[^\s*\\])\*')
+BOLD, ITALIC, CODE = 1, 2, 4
+
+# Bump when a change to structuring or imaging should invalidate incremental manifests
+MANIFEST_VERSION = 2
+
+DEFAULT_IMAGE_KEYWORDS = [
+    'process', 'workflow', 'diagram', 'chart', 'graph', 'visual',
+    'example', 'comparison', 'analysis', 'data', 'statistics',
+    'architecture', 'design', 'model', 'framework', 'structure',
+    'timeline', 'roadmap', 'overview', 'summary', 'business',
+    'strategy', 'growth', 'performance', 'results', 'metrics'
+]
+
+class ImageKeywordMatcher:
+    """Counts image keywords in slide content with one Aho-Corasick automaton over all keywords"""
+    def __init__(self, keywords=None, threshold=2):
+        keywords = DEFAULT_IMAGE_KEYWORDS if keywords is None else keywords
+        # NUL separates slides in a deck-wide scan, so no keyword may contain it
+        self.keywords = sorted({k.lower() for k in keywords if k and "\0" not in k})
+        self.threshold = threshold
+        # Keyword trie: children per state and the keyword that ends there, if any
+        children = [{}]
+        emits = [()]
+        for keyword in self.keywords:
+            state = 0
+            for ch in keyword:
+                if ch not in children[state]:
+                    children[state][ch] = len(children)
+                    children.append({})
+                    emits.append(())
+                state = children[state][ch]
+            emits[state] = (keyword,)
+        # Breadth-first, complete each state's transitions with its failure state's so
+        # the scan takes exactly one dict lookup per character; a state also emits every
+        # keyword that ends at its failure state, which credits overlapping keywords
+        self.transitions = [dict(children[0])] + [None] * (len(children) - 1)
+        fail = [0] * len(children)
+        queue = deque(children[0].values())
+        while queue:
+            state = queue.popleft()
+            emits[state] += emits[fail[state]]
+            row = dict(self.transitions[fail[state]])
+            for ch, child in children[state].items():
+                if state:
+                    fail[child] = row[ch] if ch in row else 0
+                row[ch] = child
+                queue.append(child)
+            self.transitions[state] = row
+        # NUL leads every state to a copy of the root that emits None to mark the break
+        separator = len(self.transitions)
+        self.transitions.append(dict(self.transitions[0]))
+        emits.append((None,))
+        for row in self.transitions:
+            row["\0"] = separator
+        self.emits = emits
+
+    def _scan(self, text):
+        """Return {keyword: occurrences} for each NUL-separated piece of text, in one pass"""
+        transitions, emits = self.transitions, self.emits
+        counts = {}
+        pieces = [counts]
+        state = 0
+        for ch in text:
+            state = transitions[state].get(ch, 0)
+            for keyword in emits[state]:
+                if keyword is None:
+                    counts = {}
+                    pieces.append(counts)
+                else:
+                    counts[keyword] = counts.get(keyword, 0) + 1
+        return pieces
+
+    def count(self, text):
+        """Return {keyword: occurrences} for the keywords found in text"""
+        pieces = self._scan(text)
+        counts = pieces[0]
+        for piece in pieces[1:]:
+            for keyword, occurrences in piece.items():
+                counts[keyword] = counts.get(keyword, 0) + occurrences
+        return counts
+
+    def _decide(self, counts):
+        needs_image = len(counts) >= self.threshold
+        return {
+            'needs_image': needs_image,
+            'reason': f"{len(counts)} keyword(s), threshold {self.threshold}",
+            'keywords': counts,
+        }
+
+    def explain(self, structured_content):
+        """Decide whether one slide needs an image and say why"""
+        if structured_content['type'] in ['table', 'bullet_list']:
+            return {'needs_image': True, 'reason': f"{structured_content['type']} slide", 'keywords': {}}
+        return self._decide(self.count(str(structured_content).lower()))
+
+    def explain_many(self, structured_contents):
+        """Decide for a whole deck, running the automaton once over every slide's text"""
+        decisions = [None] * len(structured_contents)
+        texts = []
+        owners = []
+        for i, content in enumerate(structured_contents):
+            if content['type'] in ['table', 'bullet_list']:
+                decisions[i] = self.explain(content)
+            else:
+                texts.append(str(content).lower())
+                owners.append(i)
+
+        pieces = iter(self._scan("\0".join(texts)) if texts else ())
+        for i, text in zip(owners, texts):
+            # A NUL inside a slide's own text splits it into more than one piece
+            counts = next(pieces)
+            for _ in range(text.count("\0")):
+                for keyword, occurrences in next(pieces).items():
+                    counts[keyword] = counts.get(keyword, 0) + occurrences
+            decisions[i] = self._decide(counts)
+        return decisions
+
 class PowerPointProcessor:
-    def __init__(self, openai_api_key=None, unsplash_api_key=None, template_path=None):
+    IMAGE_SIZE = (800, 600)
+
+    def __init__(self, openai_api_key=None, unsplash_api_key=None, template_path=None, image_dir="pics",
+                 image_workers=4, image_rate_limits=None, image_cache=None, in_memory=False,
+                 image_keywords=None, image_keyword_threshold=2, metrics=None):
         """Initialize the processor with optional API keys and template path"""
         self.openai_client = None
         self.unsplash_api_key = unsplash_api_key or os.getenv("UNSPLASH_API_KEY")
+        self.unsplash_api_url = "https://api.unsplash.com/search/photos"
         self.template_path = template_path or "trimmedTemplate.pptx"
+        self.image_dir = image_dir  # Scratch folder; give each concurrent run its own
+        self.image_workers = image_workers
+        self.image_cache = image_cache
+        self.in_memory = in_memory
+        self.image_matcher = ImageKeywordMatcher(image_keywords, image_keyword_threshold)
+        self.metrics = metrics or PipelineMetrics()
+
+        # Fade masks by (size, fade fraction) and faded PNGs by source image hash
+        self._fade_masks = {}
+        self._processed_images = OrderedDict()
+        self._processed_images_limit = 64
+        self._memo_lock = threading.Lock()
+        self._template_index = None
+
+        rate_limits = {"unsplash": 5, "openai": 1}
+        rate_limits.update(image_rate_limits or {})
+        self.rate_limiters = {
+            provider: TokenBucket(rate, capacity=max(1, int(rate)))
+            for provider, rate in rate_limits.items() if rate
+        }
+
+        # One pooled session so image downloads reuse connections
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(10, image_workers))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         
         # Use environment variable if no key provided
         openai_api_key = openai_api_key or os.getenv("OPEN_AI")
@@ -31,51 +196,35 @@ class PowerPointProcessor:
         
     def extract_text_from_pptx(self, file_path):
         """Extract text content from PowerPoint slides"""
-        prs = Presentation(file_path)
-        slides_content = []
-        
-        for i, slide in enumerate(prs.slides):
-            slide_text = []
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    slide_text.append(shape.text.strip())
-            
-            slides_content.append({
-                'slide_number': i + 1,
-                'content': slide_text
-            })
-        
-        return slides_content
-    
+        _, records = load_deck(file_path)
+        return self.slides_content_from_records(records)
+
+    def slides_content_from_records(self, records):
+        """Convert SlideRecords into the slides_content format used by structure_content"""
+        return [
+            {'slide_number': record.slide_number, 'content': list(record.texts)}
+            for record in records
+        ]
+
     def _extract_slide_texts(self, prs):
         """Extract text content from PowerPoint slides with better handling of long text"""
-        texts = []
-        for i, slide in enumerate(prs.slides):
-            slide_text = ""
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    # Append text with a newline separator
-                    slide_text += shape.text.strip() + "\n\n"
-            texts.append({
-                'slide_number': i + 1,
-                'content': slide_text.strip()
-            })
-        return texts
-    
+        return [
+            {'slide_number': record.slide_number, 'content': "\n\n".join(record.texts)}
+            for record in extract_slides(prs)
+        ]
+
     def structure_content(self, slides_content):
         """Convert slides to properly structured format with headings, tables, and bullet points"""
-        structured_slides = []
+        structured_contents = [self._analyze_and_structure_text(slide['content']) for slide in slides_content]
+        image_needs = self.image_matcher.explain_many(structured_contents)
         
-        for slide in slides_content:
-            slide_num = slide['slide_number']
-            content = slide['content']
-            
-            structured_content = self._analyze_and_structure_text(content)
-            
+        structured_slides = []
+        for slide, structured_content, image_need in zip(slides_content, structured_contents, image_needs):
             structured_slides.append({
-                'slide_number': slide_num,
+                'slide_number': slide['slide_number'],
                 'structured_content': structured_content,
-                'needs_image': self._determine_image_need(structured_content)
+                'needs_image': image_need['needs_image'],
+                'image_need': image_need
             })
         
         return structured_slides
@@ -86,6 +235,8 @@ class PowerPointProcessor:
             return {'type': 'empty', 'title': 'Empty Slide', 'data': []}
         
         combined_text = '\n'.join(content)
+        # Split and match the lines once for both bullet checks
+        scan = self._scan_lines(combined_text)
         
         # Detect if content looks like tabular data
         if self._is_tabular_data(combined_text):
@@ -96,11 +247,11 @@ class PowerPointProcessor:
             }
         
         # Detect if content has bullet points or lists
-        elif self._has_bullet_points(combined_text):
+        elif self._has_bullet_points(combined_text, scan):
             return {
                 'type': 'bullet_list',
                 'title': self._extract_title(content[0] if content else 'Key Points'),
-                'points': self._extract_bullet_points(combined_text)
+                'points': self._extract_bullet_points(combined_text, scan)
             }
         
         # Default to structured text with heading
@@ -113,25 +264,19 @@ class PowerPointProcessor:
     
     def _is_tabular_data(self, text):
         """Check if text contains tabular data patterns"""
-        patterns = [
-            r'\t.*\t',  # Tab-separated
-            r'\|.*\|',  # Pipe-separated
-            r':\s*\d+',  # Colon-number pairs
-            r'\d+\.\d+%',  # Percentages
-        ]
-        return any(re.search(pattern, text) for pattern in patterns)
+        return TABULAR_PATTERN.search(text) is not None
     
-    def _has_bullet_points(self, text):
-        """Check if text has bullet point patterns"""
-        patterns = [
-            r'^[\•\-\*]\s',  # Bullet symbols
-            r'^\d+\.\s',     # Numbered lists
-            r'^[a-zA-Z]\.\s' # Letter lists
-        ]
+    def _scan_lines(self, text):
+        """Split text into lines and match each stripped line against BULLET_PATTERN"""
         lines = text.split('\n')
+        return lines, [BULLET_PATTERN.match(line.strip()) for line in lines]
+    
+    def _has_bullet_points(self, text, scan=None):
+        """Check if text has bullet point patterns"""
+        lines, matches = scan or self._scan_lines(text)
         if not lines:
             return False
-        bullet_lines = sum(1 for line in lines if any(re.match(pattern, line.strip()) for pattern in patterns))
+        bullet_lines = sum(1 for match in matches if match)
         return bullet_lines > len(lines) * 0.3  # 30% of lines are bullet points
     
     def _extract_title(self, first_line):
@@ -163,20 +308,25 @@ class PowerPointProcessor:
         
         return table_data
     
-    def _extract_bullet_points(self, text):
-        """Extract bullet points from text"""
-        lines = text.split('\n')
-        points = []
+    def _extract_bullet_points(self, text, scan=None):
+        """Extract bullet points from text in a single pass over its lines"""
+        lines, matches = scan or self._scan_lines(text)
+        
+        # Where each line first occurs, and whether a bullet came before each position
+        first_index = {}
+        bullet_before = []
+        seen_bullet = False
+        for i, (line, match) in enumerate(zip(lines, matches)):
+            first_index.setdefault(line, i)
+            bullet_before.append(seen_bullet)
+            seen_bullet = seen_bullet or match is not None
         
-        for line in lines:
+        points = []
+        for i, (line, match) in enumerate(zip(lines, matches)):
             line = line.strip()
-            if re.match(r'^[\•\-\*]\s', line):
-                points.append(re.sub(r'^[\•\-\*]\s', '', line))
-            elif re.match(r'^\d+\.\s', line):
-                points.append(re.sub(r'^\d+\.\s', '', line))
-            elif re.match(r'^[a-zA-Z]\.\s', line):
-                points.append(re.sub(r'^[a-zA-Z]\.\s', '', line))
-            elif line and not any(re.match(r'^[\•\-\*]\s|^\d+\.\s|^[a-zA-Z]\.\s', l.strip()) for l in lines[:max(0, lines.index(line))]):
+            if match:
+                points.append(line[match.end():])
+            elif line and not bullet_before[first_index.get(line, i)]:
                 # This might be a title or header - skip
                 continue
             elif line:
@@ -202,34 +352,59 @@ class PowerPointProcessor:
     
     def _determine_image_need(self, structured_content):
         """Determine if a slide would benefit from an image"""
-        image_keywords = [
-            'process', 'workflow', 'diagram', 'chart', 'graph', 'visual',
-            'example', 'comparison', 'analysis', 'data', 'statistics',
-            'architecture', 'design', 'model', 'framework', 'structure',
-            'timeline', 'roadmap', 'overview', 'summary', 'business',
-            'strategy', 'growth', 'performance', 'results', 'metrics'
-        ]
-        
-        content_text = str(structured_content).lower()
-        keyword_matches = sum(1 for keyword in image_keywords if keyword in content_text)
-        
-        # Also consider content type
-        if structured_content['type'] in ['table', 'bullet_list']:
-            return True
-        
-        return keyword_matches >= 2
+        return self.image_matcher.explain(structured_content)['needs_image']
     
-    def generate_images_for_slides(self, structured_slides):
-        """Generate images for slides that need them"""
-        for slide in structured_slides:
-            if slide['needs_image']:
-                image_prompt = self._create_image_prompt(slide['structured_content'])
-                image_path = self._generate_image(image_prompt, slide['slide_number'])
-                slide['image_path'] = image_path
-            else:
+    def generate_images_for_slides(self, structured_slides, representatives=None):
+        """Generate images for slides that need them, fetching several at once"""
+        if representatives is None:
+            representatives = range(len(structured_slides))
+
+        def shares_image(i):
+            representative = representatives[i]
+            return representative != i and structured_slides[representative]['needs_image']
+
+        needs_image = [slide for i, slide in enumerate(structured_slides)
+                       if slide['needs_image'] and not shares_image(i)]
+        with ThreadPoolExecutor(max_workers=max(1, self.image_workers)) as executor:
+            for slide, image in zip(needs_image, executor.map(self._fetch_image, needs_image)):
+                self._attach_image(slide, image)
+
+        for i, slide in enumerate(structured_slides):
+            if not slide['needs_image']:
                 slide['image_path'] = None
+            elif shares_image(i):
+                self._share_image(slide, structured_slides[representatives[i]])
         
         return structured_slides
+
+    def _fetch_image(self, slide):
+        """Fetch the image for one structured slide"""
+        with self.metrics.slide(slide['slide_number'], 'image_acquisition'):
+            image_prompt = self._create_image_prompt(slide['structured_content'])
+            return self._generate_image(image_prompt, slide['slide_number'])
+
+    def _attach_image(self, slide, image):
+        # In memory mode the providers hand back PIL images instead of paths
+        if isinstance(image, Image.Image):
+            slide['image'] = image
+            slide['image_path'] = None
+            slide['image_placeholder'] = bool(image.info.get('placeholder'))
+        else:
+            slide['image_path'] = image
+            slide['image_placeholder'] = bool(image) and os.path.basename(image).startswith("placeholder_image_")
+
+    def _share_image(self, slide, representative):
+        slide['image_path'] = representative['image_path']
+        slide['image_placeholder'] = representative.get('image_placeholder', False)
+        if 'image' in representative:
+            slide['image'] = representative['image']
+        self.metrics.increment('images_shared')
+
+    def _wait_for_rate_limit(self, provider):
+        """Block until the provider's rate limit allows another request"""
+        limiter = self.rate_limiters.get(provider)
+        if limiter:
+            limiter.acquire()
     
     def _create_image_prompt(self, content):
         """Create a prompt for image generation based on content"""
@@ -243,20 +418,29 @@ class PowerPointProcessor:
         else:
             return "business professional office meeting presentation corporate"
     
+    def _image_provider(self):
+        """Name of the image source this processor will use"""
+        if self.unsplash_api_key:
+            return "unsplash"
+        if self.openai_client:
+            return "openai"
+        return "placeholder"
+
     def _generate_image(self, prompt, slide_number):
         """Generate image using available APIs or create a placeholder"""
         # Create pics directory if it doesn't exist
-        pics_dir = "pics"
-        if not os.path.exists(pics_dir):
-            os.makedirs(pics_dir)
+        pics_dir = self.image_dir
+        if not self.in_memory:
+            os.makedirs(pics_dir, exist_ok=True)
         
         try:
+            provider = self._image_provider()
             # Try Unsplash first
-            if self.unsplash_api_key:
+            if provider == "unsplash":
                 return self._get_unsplash_image(prompt, slide_number, pics_dir)
             
             # Try OpenAI DALL-E (new API)
-            elif self.openai_client:
+            elif provider == "openai":
                 return self._generate_openai_image(prompt, slide_number, pics_dir)
             
             else:
@@ -267,10 +451,45 @@ class PowerPointProcessor:
             print(f"Error generating image for slide {slide_number}: {e}")
             return self._create_placeholder_image(prompt, slide_number, pics_dir)
 
+    def _cached_image(self, provider, prompt, slide_number, pics_dir):
+        """Write a cached image for the query into pics_dir, or return None on a miss"""
+        if self.image_cache is None:
+            return None
+        data = self.image_cache.choose(provider, prompt, self.IMAGE_SIZE, slide_number)
+        if data is None:
+            self.metrics.increment('image_cache_misses')
+            return None
+        self.metrics.increment('image_cache_hits')
+        if self.in_memory:
+            return Image.open(BytesIO(data))
+        image_path = os.path.join(pics_dir, f"{provider}_image_slide_{slide_number}.jpg")
+        with open(image_path, "wb") as f:
+            f.write(data)
+        return image_path
+
+    def _save_image(self, image, image_path, provider, prompt, variant):
+        """Encode a processed image once, saving it to image_path and the cache"""
+        if self.in_memory and self.image_cache is None:
+            return image
+        buffer = BytesIO()
+        image.save(buffer, "JPEG", quality=85)
+        data = buffer.getvalue()
+        if self.image_cache is not None:
+            self.image_cache.put(provider, prompt, self.IMAGE_SIZE, variant, data)
+        if self.in_memory:
+            return image
+        with open(image_path, "wb") as f:
+            f.write(data)
+        return image_path
+
     def _get_unsplash_image(self, prompt, slide_number, pics_dir):
         """Get image from Unsplash API"""
         try:
-            url = "https://api.unsplash.com/search/photos"
+            cached_path = self._cached_image("unsplash", prompt, slide_number, pics_dir)
+            if cached_path:
+                return cached_path
+
+            url = self.unsplash_api_url
             headers = {"Authorization": f"Client-ID {self.unsplash_api_key}"}
             params = {
                 "query": prompt,
@@ -278,28 +497,38 @@ class PowerPointProcessor:
                 "orientation": "landscape"
             }
             
-            response = requests.get(url, headers=headers, params=params)
+            self._wait_for_rate_limit("unsplash")
+            self.metrics.increment('unsplash_searches')
+            response = self.session.get(url, headers=headers, params=params, timeout=30)
             response.raise_for_status()
             
             data = response.json()
             
             if data['results']:
-                # Get a random image from results
-                image_data = random.choice(data['results'])
+                # Get a random image from results, preferring ones not cached yet
+                results = data['results']
+                if self.image_cache is not None:
+                    stored = set(self.image_cache.variants("unsplash", prompt, self.IMAGE_SIZE))
+                    results = [
+                        result for result in results
+                        if self.image_cache.variant_id(result.get('id') or result['urls']['regular']) not in stored
+                    ] or results
+                image_data = random.choice(results)
                 image_url = image_data['urls']['regular']
                 
                 # Download and save image
-                img_response = requests.get(image_url)
+                img_response = self.session.get(image_url, timeout=60)
                 img_response.raise_for_status()
+                self.metrics.increment('image_downloads')
+                self.metrics.increment('bytes_downloaded', len(img_response.content))
                 
                 image = Image.open(BytesIO(img_response.content))
                 
                 # Resize image for presentation
-                image = image.resize((800, 600), Image.Resampling.LANCZOS)
+                image = image.resize(self.IMAGE_SIZE, Image.Resampling.LANCZOS)
                 
                 image_path = os.path.join(pics_dir, f"unsplash_image_slide_{slide_number}.jpg")
-                image.save(image_path, "JPEG", quality=85)
-                return image_path
+                return self._save_image(image, image_path, "unsplash", prompt, image_data.get('id') or image_url)
             
             else:
                 return self._create_placeholder_image(prompt, slide_number, pics_dir)
@@ -311,8 +540,14 @@ class PowerPointProcessor:
     def _generate_openai_image(self, prompt, slide_number, pics_dir):
         """Generate image using OpenAI DALL-E (new API)"""
         try:
+            cached_path = self._cached_image("openai", prompt, slide_number, pics_dir)
+            if cached_path:
+                return cached_path
+
             full_prompt = f"Create a professional business presentation image for: {prompt}. Modern, clean design suitable for corporate presentation. High quality, professional photography style."
             
+            self._wait_for_rate_limit("openai")
+            self.metrics.increment('openai_image_generations')
             response = self.openai_client.images.generate(
                 model="dall-e-3",
                 prompt=full_prompt,
@@ -324,17 +559,18 @@ class PowerPointProcessor:
             image_url = response.data[0].url
             
             # Download and save image
-            img_response = requests.get(image_url)
+            img_response = self.session.get(image_url, timeout=60)
             img_response.raise_for_status()
+            self.metrics.increment('image_downloads')
+            self.metrics.increment('bytes_downloaded', len(img_response.content))
             
             image = Image.open(BytesIO(img_response.content))
             
             # Resize for presentation
-            image = image.resize((800, 600), Image.Resampling.LANCZOS)
+            image = image.resize(self.IMAGE_SIZE, Image.Resampling.LANCZOS)
             
             image_path = os.path.join(pics_dir, f"openai_image_slide_{slide_number}.jpg")
-            image.save(image_path, "JPEG", quality=85)
-            return image_path
+            return self._save_image(image, image_path, "openai", prompt, image_url)
             
         except Exception as e:
             print(f"OpenAI API error: {e}")
@@ -375,96 +611,76 @@ class PowerPointProcessor:
         
         # Add simple graphic element
         draw.ellipse([350, 350, 450, 450], fill='#007bff', outline='#0056b3', width=2)
+        img.info['placeholder'] = True
         
+        if self.in_memory:
+            return img
         image_path = os.path.join(pics_dir, f"placeholder_image_slide_{slide_number}.png")
         img.save(image_path)
         return image_path
     
+    def _get_template_index(self):
+        """Load and index the template the first time it is needed"""
+        if self._template_index is None:
+            self._template_index = TemplateIndex(self.template_path)
+        return self._template_index
+
     def create_presentation_from_template(self, structured_slides, output_path="enhanced_presentation.pptx"):
         """Create presentation using existing template"""
-        try:
-            # Load the existing template
-            if os.path.exists(self.template_path):
-                prs = Presentation(self.template_path)
-                print(f"✅ Loaded template: {self.template_path}")
-            else:
-                print(f"⚠️ Template not found: {self.template_path}, creating new presentation")
-                prs = Presentation()
-        except Exception as e:
-            print(f"⚠️ Error loading template: {e}, creating new presentation")
-            prs = Presentation()
-        
-        # Clear existing slides except master/layout slides
-        slide_count = len(prs.slides)
-        for i in range(slide_count - 1, -1, -1):
-            if i < len(prs.slides):
-                try:
-                    xml_slides = prs.slides._sldIdLst
-                    xml_slides.remove(xml_slides[i])
-                except:
-                    pass
-        
-        # Get available layouts
-        available_layouts = len(prs.slide_layouts)
-        print(f"📝 Available slide layouts: {available_layouts}")
+        template = self._get_template_index()
+        prs = template.new_presentation()
+        layout = prs.slide_layouts[template.content_layout_index]
+        roles = template.content_roles
         
         # Add slides using template layouts
-        for slide_data in structured_slides:
-            # Choose appropriate layout (try layout 1 for content, fallback to 0)
-            try:
-                if available_layouts > 1:
-                    layout = prs.slide_layouts[1]  # Usually content layout
-                else:
-                    layout = prs.slide_layouts[0]  # Title or blank layout
-            except:
-                layout = prs.slide_layouts[0]  # Fallback to first available
-            
-            slide = prs.slides.add_slide(layout)
-            self._populate_template_slide(slide, slide_data)
+        with self.metrics.stage('layout'):
+            for slide_data in structured_slides:
+                with self.metrics.slide(slide_data['slide_number'], 'layout'):
+                    slide = prs.slides.add_slide(layout)
+                    self._populate_template_slide(slide, slide_data, roles)
         
         # Save the presentation
-        prs.save(output_path)
+        with self.metrics.stage('saving'):
+            prs.save(output_path)
         return output_path
     
-    def _populate_template_slide(self, slide, slide_data):
+    def _populate_template_slide(self, slide, slide_data, roles=None):
         """Populate a template slide with content"""
         content = slide_data['structured_content']
-        image_path = slide_data.get('image_path')
-        
-        # Try to use existing placeholders first
-        title_filled = False
-        content_filled = False
+        image = slide_data.get('image')
+        if image is None:
+            image_path = slide_data.get('image_path')
+            if image_path and os.path.exists(image_path):
+                image = image_path
+        if roles is None:
+            roles = placeholder_roles(slide)
         
         # Fill title placeholder if available
-        if hasattr(slide, 'shapes'):
-            for shape in slide.shapes:
-                if hasattr(shape, 'placeholder_format') and shape.placeholder_format is not None:
-                    # This is a placeholder
-                    if hasattr(shape, 'text_frame') and not title_filled:
-                        # Title placeholder
-                        if shape.text_frame is not None:
-                            shape.text_frame.text = content['title']
-                            # Style the title
-                            for paragraph in shape.text_frame.paragraphs:
-                                paragraph.font.size = Pt(24)
-                                paragraph.font.bold = True
-                                paragraph.alignment = PP_ALIGN.CENTER  # Center align title
-                            title_filled = True
-                    elif hasattr(shape, 'text_frame') and not content_filled and title_filled:
-                        # Content placeholder
-                        self._fill_content_placeholder(shape, content)
-                        content_filled = True
+        title_filled = 'title' in roles
+        if title_filled:
+            text_frame = slide.placeholders[roles['title']].text_frame
+            text_frame.text = content['title']
+            # Style the title
+            for paragraph in text_frame.paragraphs:
+                paragraph.font.size = Pt(24)
+                paragraph.font.bold = True
+                paragraph.alignment = PP_ALIGN.CENTER  # Center align title
+        
+        # Content placeholder
+        content_filled = 'body' in roles
+        if content_filled:
+            self._fill_content_placeholder(slide.placeholders[roles['body']], content)
         
         # If no placeholders found or not filled, add textboxes manually
         if not title_filled:
             self._add_title_textbox(slide, content['title'])
         
         if not content_filled:
-            self._add_content_textbox(slide, content, image_path)
+            self._add_content_textbox(slide, content, image)
         
         # Add image if available and there's space
-        if image_path and os.path.exists(image_path):
-            self._add_image_to_slide(slide, image_path)
+        if image is not None:
+            self._add_image_to_slide(slide, image, roles.get('picture'), slide_data.get('slide_number'))
     
     def _fill_content_placeholder(self, shape, content):
         """Fill content placeholder based on content type with centered alignment"""
@@ -494,11 +710,7 @@ class PowerPointProcessor:
                 else:
                     # Apply formatting
                     p.text = ""
-                    for text_part, is_bold in formatted_parts:
-                        run = p.add_run()
-                        run.text = text_part
-                        if is_bold:
-                            run.font.bold = True
+                    self._add_formatted_runs(p, formatted_parts)
                 
                 p.level = 0  # First level bullet
                 p.font.size = Pt(18)
@@ -554,11 +766,7 @@ class PowerPointProcessor:
             # Apply formatting
             p = text_frame.paragraphs[0]
             p.text = ""
-            for text_part, is_bold in formatted_parts:
-                run = p.add_run()
-                run.text = text_part
-                if is_bold:
-                    run.font.bold = True
+            self._add_formatted_runs(p, formatted_parts)
         
         # Set text frame properties
         text_frame.margin_left = Inches(0.1)
@@ -571,10 +779,10 @@ class PowerPointProcessor:
         p.font.color.rgb = RGBColor(0, 0, 0)
         p.alignment = PP_ALIGN.CENTER  # Center align title
     
-    def _add_content_textbox(self, slide, content, image_path):
+    def _add_content_textbox(self, slide, content, image):
         """Add content textbox with centered alignment and appropriate layout"""
         # Adjust layout based on whether image is present
-        if image_path and os.path.exists(image_path):
+        if image is not None:
             left = Inches(0.5)
             top = Inches(2)
             width = Inches(5.5)
@@ -614,11 +822,7 @@ class PowerPointProcessor:
                 else:
                     # Apply formatting with bullet
                     p.text = "• "  # Start with bullet
-                    for text_part, is_bold in formatted_parts:
-                        run = p.add_run()
-                        run.text = text_part
-                        if is_bold:
-                            run.font.bold = True
+                    self._add_formatted_runs(p, formatted_parts)
                             
                 p.font.size = Pt(16)
                 p.font.color.rgb = RGBColor(0, 0, 0)
@@ -641,11 +845,7 @@ class PowerPointProcessor:
                 else:
                     # Apply formatting
                     p.text = ""
-                    for text_part, is_bold in formatted_parts:
-                        run = p.add_run()
-                        run.text = text_part
-                        if is_bold:
-                            run.font.bold = True
+                    self._add_formatted_runs(p, formatted_parts)
                             
                 p.font.size = Pt(20)
                 p.font.color.rgb = RGBColor(0, 0, 0)
@@ -671,109 +871,423 @@ class PowerPointProcessor:
                 else:
                     # Apply formatting
                     p.text = ""
-                    for text_part, is_bold in formatted_parts:
-                        run = p.add_run()
-                        run.text = text_part
-                        if is_bold:
-                            run.font.bold = True
+                    self._add_formatted_runs(p, formatted_parts)
                             
                 p.font.size = Pt(12)
                 p.font.color.rgb = RGBColor(0, 0, 0)
                 p.alignment = PP_ALIGN.CENTER  # Center align table rows
                 p.space_after = Pt(8)
 
-    def add_fade_to_edges(self,image_path, output_path):
-        img = Image.open(image_path).convert("RGBA")
+    def _build_fade_mask(self, size, fade_fraction=0.15):
+        """Build a linear edge-fade alpha mask without touching individual pixels"""
+        # Masks are shared between images, so callers must not modify them
+        key = (tuple(size), fade_fraction)
+        mask = self._fade_masks.get(key)
+        if mask is not None:
+            return mask
 
-        # Create gradient mask
-        mask = Image.new("L", img.size, 255)
-        draw = ImageDraw.Draw(mask)
+        width, height = size
+        fade_width = int(min(size) * fade_fraction)
 
-        # Feather/fade area size
-        fade_width = int(min(img.size) * 0.15)
-
-        # Apply a radial gradient for fading
-        for x in range(img.size[0]):
-            for y in range(img.size[1]):
-                distance_to_edge = min(x, y, img.size[0]-x, img.size[1]-y)
+        def ramp(length):
+            # Alpha for each distance to the nearest edge along one axis
+            values = []
+            for i in range(length):
+                distance_to_edge = min(i, length - i)
                 if distance_to_edge < fade_width:
-                    fade = int(255 * (distance_to_edge / fade_width))
-                    mask.putpixel((x, y), fade)
+                    values.append(int(255 * (distance_to_edge / fade_width)))
+                else:
+                    values.append(255)
+            return bytes(values)
+
+        # The fade is monotonic in the distance, so the alpha of a pixel is the
+        # darker of its row ramp and its column ramp
+        horizontal = Image.frombytes("L", (width, 1), ramp(width)).resize(size, Image.Resampling.NEAREST)
+        vertical = Image.frombytes("L", (1, height), ramp(height)).resize(size, Image.Resampling.NEAREST)
+        mask = ImageChops.darker(horizontal, vertical)
+        with self._memo_lock:
+            self._fade_masks[key] = mask
+        return mask
+
+    def _fade_image(self, img, fade_fraction=0.15):
+        """Return an RGBA copy of a PIL image with its edges faded to transparent"""
+        img = img.convert("RGBA")
+
+        # Feather/fade area is a fraction of the shorter side
+        mask = self._build_fade_mask(img.size, fade_fraction)
 
         img.putalpha(mask)
-        img.save(output_path, "PNG")
-        
-    def _add_image_to_slide(self, slide, image_path):
+        return img
+
+    def add_fade_to_edges(self, image_path, output_path, fade_fraction=0.15):
+        """Fade the edges of an image to transparent and save it as PNG"""
+        with Image.open(image_path) as img:
+            faded = self._fade_image(img, fade_fraction)
+        faded.save(output_path, "PNG")
+
+    def _faded_picture(self, image, slide_number=None):
+        """Return the faded PNG bytes for an image path or PIL image"""
+        if isinstance(image, Image.Image):
+            digest = hashlib.sha1(f"{image.mode}{image.size}".encode())
+            digest.update(image.tobytes())
+        else:
+            with open(image, "rb") as f:
+                source = f.read()
+            digest = hashlib.sha1(source)
+            image = Image.open(BytesIO(source))
+        # Keyed by content, so a picture on several slides is encoded once and embedded as one media part
+        key = digest.hexdigest()
+
+        with self._memo_lock:
+            if key in self._processed_images:
+                self._processed_images.move_to_end(key)
+                return self._processed_images[key]
+
+        # Timed per slide: fading runs inside the layout stage, so a stage timer would count it twice
+        timer = self.metrics.slide(slide_number, 'fading') if slide_number is not None else nullcontext()
+        with timer:
+            buffer = BytesIO()
+            self._fade_image(image).save(buffer, "PNG")
+            data = buffer.getvalue()
+        with self._memo_lock:
+            self._processed_images[key] = data
+            while len(self._processed_images) > self._processed_images_limit:
+                self._processed_images.popitem(last=False)
+        return data
+
+    def _add_image_to_slide(self, slide, image, picture_idx=None, slide_number=None):
         """Add image to slide with appropriate positioning"""
-        
-        self.add_fade_to_edges(image_path,f'{image_path}.faded')
+        picture = BytesIO(self._faded_picture(image, slide_number))
+        if picture_idx is not None:
+            try:
+                slide.placeholders[picture_idx].insert_picture(picture)
+                return
+            except Exception as e:
+                print(f"Error filling picture placeholder: {e}")
+                picture.seek(0)
         try:
             left = Inches(7.5)
             top = Inches(2.5)
             width = Inches(3)
             height = Inches(3)
             
-            slide.shapes.add_picture(f'{image_path}.faded', left, top, width, height)
+            slide.shapes.add_picture(picture, left, top, width, height)
         except Exception as e:
             print(f"Error adding image to slide: {e}")
+    def _add_formatted_runs(self, p, formatted_parts):
+        """Append (text, style) runs from _process_text_formatting to a paragraph"""
+        for text_part, style in formatted_parts:
+            run = p.add_run()
+            run.text = text_part
+            if style & BOLD:
+                run.font.bold = True
+            if style & ITALIC:
+                run.font.italic = True
+            if style & CODE:
+                run.font.name = "Consolas"
+
     def _process_text_formatting(self, text):
-        """Process text to apply formatting patterns like **bold**"""
-        # Check if the text contains bold pattern
-        if "**" in text:
-            # Extract text between ** markers
-            parts = []
-            is_bold = False
-            current_part = ""
-            
-            i = 0
-            while i < len(text):
-                if i + 1 < len(text) and text[i:i+2] == "**":
-                    # Found a bold marker, toggle bold state
-                    parts.append((current_part, is_bold))
-                    current_part = ""
-                    is_bold = not is_bold
-                    i += 2
-                else:
-                    current_part += text[i]
-                    i += 1
-                    
-            # Add the last part
-            if current_part:
-                parts.append((current_part, is_bold))
-                
-            return parts
-        else:
+        """Split **bold**, *italic* and `code` markup into (text, style) runs"""
+        if "*" not in text and "`" not in text:
             # No special formatting, return as regular text
-            return [(text, False)]
-    def process_presentation(self, input_pptx_path, output_pptx_path="enhanced_presentation.pptx"):
-        """Main method to process the entire presentation using template"""
+            return [(text, 0)]
+
+        runs = []
+        pieces = []
+        piece_style = 0
+        bold = 0
+
+        def add(segment, style):
+            nonlocal piece_style
+            if not segment:
+                return
+            if style != piece_style and pieces:
+                runs.append(("".join(pieces), piece_style))
+                pieces.clear()
+            piece_style = style
+            pieces.append(segment)
+
+        position = 0
+        for match in FORMATTING_PATTERN.finditer(text):
+            add(text[position:match.start()], bold)
+            token = match.group()
+            if token == "**":
+                bold ^= BOLD
+            elif token == "\\*":
+                add("*", bold)
+            elif match.group(1) is not None:
+                add(match.group(1), bold | CODE)
+            else:
+                add(match.group(2), bold | ITALIC)
+            position = match.end()
+        add(text[position:], bold)
+
+        if pieces:
+            runs.append(("".join(pieces), piece_style))
+        return runs or [("", 0)]
+
+    def _slide_fingerprint(self, content):
+        """Hash a slide's extracted content together with the settings that shape its output"""
+        settings = {
+            'version': MANIFEST_VERSION,
+            'template': os.path.abspath(self.template_path),
+            'image_keywords': self.image_matcher.keywords,
+            'image_keyword_threshold': self.image_matcher.threshold,
+            'image_size': self.IMAGE_SIZE,
+            'image_provider': self._image_provider(),
+        }
+        payload = json.dumps({'content': content, 'settings': settings}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load_manifest(self, output_pptx_path):
+        """Return the slide entries reusable from the previous run's manifest"""
+        manifest_path = f"{output_pptx_path}.manifest.json"
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        if manifest.get('version') != MANIFEST_VERSION:
+            return {}
+        return manifest.get('slides', {})
+
+    def _reuse_slide(self, slide_number, entry, assets_dir):
+        """Rebuild a structured slide from a manifest entry, or None if its image is gone"""
+        slide = {
+            'slide_number': slide_number,
+            'structured_content': entry['structured_content'],
+            'needs_image': entry['needs_image'],
+            'image_need': entry.get('image_need'),
+            'image_path': None,
+            'image_placeholder': entry.get('placeholder', False),
+        }
+        asset = entry.get('asset')
+        if asset:
+            asset_path = os.path.join(assets_dir, asset)
+            if not os.path.exists(asset_path):
+                return None
+            if self.in_memory:
+                with Image.open(asset_path) as img:
+                    slide['image'] = img.copy()
+            else:
+                slide['image_path'] = asset_path
+        elif entry['needs_image']:
+            return None
+        return slide
+
+    def _save_manifest(self, output_pptx_path, slides, fingerprints):
+        """Write the fingerprint manifest and keep one stored image per fetched slide image"""
+        assets_dir = f"{output_pptx_path}.assets"
+        os.makedirs(assets_dir, exist_ok=True)
+        entries = {}
+        for slide, fingerprint in zip(slides, fingerprints):
+            image = slide.get('image')
+            image_path = slide.get('image_path')
+            asset = None
+            placeholder = bool(slide.get('image_placeholder'))
+            if placeholder and self._image_provider() != "placeholder":
+                # A stand-in for a failed fetch is not stored, so the next run fetches again
+                image = image_path = None
+            if image is not None:
+                asset = f"{fingerprint}.png"
+                if not os.path.exists(os.path.join(assets_dir, asset)):
+                    image.save(os.path.join(assets_dir, asset), "PNG")
+            elif image_path and os.path.exists(image_path):
+                asset = fingerprint + os.path.splitext(image_path)[1]
+                asset_path = os.path.join(assets_dir, asset)
+                if os.path.abspath(image_path) != os.path.abspath(asset_path):
+                    shutil.copyfile(image_path, asset_path)
+            entries[fingerprint] = {
+                'structured_content': slide['structured_content'],
+                'needs_image': slide['needs_image'],
+                'image_need': slide.get('image_need'),
+                'asset': asset,
+                'placeholder': placeholder,
+            }
+
+        # Forget images of slides that no longer exist
+        kept = {entry['asset'] for entry in entries.values() if entry['asset']}
+        for name in os.listdir(assets_dir):
+            if name not in kept:
+                os.remove(os.path.join(assets_dir, name))
+
+        with open(f"{output_pptx_path}.manifest.json", "w", encoding="utf-8") as f:
+            json.dump({'version': MANIFEST_VERSION, 'slides': entries}, f)
+
+    def _process_sequential(self, input_pptx_path, output_pptx_path, records, incremental, dedup_threshold):
+        """Run each step over the whole deck before the next; return the slides and their fingerprints"""
         print("Step 1: Extracting content from PowerPoint...")
-        slides_content = self.extract_text_from_pptx(input_pptx_path)
+        with self.metrics.stage('extraction'):
+            if records is None:
+                slides_content = self.extract_text_from_pptx(input_pptx_path)
+            else:
+                slides_content = self.slides_content_from_records(records)
+        
+        reused = {}
+        fingerprints = []
+        if incremental:
+            fingerprints = [self._slide_fingerprint(slide['content']) for slide in slides_content]
+            manifest = self._load_manifest(output_pptx_path)
+            assets_dir = f"{output_pptx_path}.assets"
+            for i, (slide, fingerprint) in enumerate(zip(slides_content, fingerprints)):
+                if fingerprint in manifest:
+                    reused_slide = self._reuse_slide(slide['slide_number'], manifest[fingerprint], assets_dir)
+                    if reused_slide is not None:
+                        reused[i] = reused_slide
+            self.metrics.increment('slides_reused', len(reused))
+            print(f"♻️  Reusing {len(reused)} unchanged slides, rebuilding {len(slides_content) - len(reused)}")
+        changed_content = [slide for i, slide in enumerate(slides_content) if i not in reused]
         
         print("Step 2: Structuring content...")
-        structured_slides = self.structure_content(slides_content)
+        with self.metrics.stage('structuring'):
+            structured_slides = self.structure_content(changed_content)
+        
+        representatives = None
+        if dedup_threshold is not None:
+            with self.metrics.stage('dedup'):
+                representatives = cluster_near_duplicates(
+                    ("\n".join(slide['content']) for slide in changed_content), dedup_threshold)
+            duplicates = sum(1 for i, representative in enumerate(representatives) if representative != i)
+            self.metrics.increment('near_duplicate_slides', duplicates)
+            if duplicates:
+                print(f"🪞 {duplicates} near-duplicate slides will share their representative's image")
         
         print("Step 3: Generating images for relevant slides...")
-        slides_with_images = self.generate_images_for_slides(structured_slides)
+        with self.metrics.stage('image_acquisition'):
+            changed_slides = iter(self.generate_images_for_slides(structured_slides, representatives))
+        slides_with_images = [
+            reused[i] if i in reused else next(changed_slides)
+            for i in range(len(slides_content))
+        ]
         
         print("Step 4: Creating presentation from template...")
-        final_presentation_path = self.create_presentation_from_template(slides_with_images, output_pptx_path)
+        self.create_presentation_from_template(slides_with_images, output_pptx_path)
+        return slides_with_images, fingerprints
+
+    def _process_pipelined(self, input_pptx_path, output_pptx_path, records, incremental, dedup_threshold,
+                           queue_size):
+        """Stream slides through overlapping steps; return the slides and their fingerprints"""
+        print("Steps 1-4: Extracting, structuring, imaging and laying out slides in a pipeline...")
+        if records is None:
+            slides_content = ({'slide_number': number, 'content': list(texts)}
+                              for number, texts in enumerate(iter_slide_texts(input_pptx_path), 1))
+        else:
+            slides_content = self.slides_content_from_records(records)
+        manifest = self._load_manifest(output_pptx_path) if incremental else {}
+        assets_dir = f"{output_pptx_path}.assets"
+        index = NearDuplicateIndex(dedup_threshold) if dedup_threshold is not None else None
+        changed = []
+        duplicates = []
+
+        template = self._get_template_index()
+        prs = template.new_presentation()
+        layout = prs.slide_layouts[template.content_layout_index]
+        roles = template.content_roles
+
+        def structure(slide):
+            # Returns (slide, fingerprint, reused, slide whose image it shares)
+            fingerprint = self._slide_fingerprint(slide['content']) if incremental else None
+            if fingerprint in manifest:
+                reused_slide = self._reuse_slide(slide['slide_number'], manifest[fingerprint], assets_dir)
+                if reused_slide is not None:
+                    return reused_slide, fingerprint, True, None
+            with self.metrics.slide(slide['slide_number'], 'structuring'):
+                structured_content = self._analyze_and_structure_text(slide['content'])
+                image_need = self.image_matcher.explain(structured_content)
+            structured = {
+                'slide_number': slide['slide_number'],
+                'structured_content': structured_content,
+                'needs_image': image_need['needs_image'],
+                'image_need': image_need,
+            }
+            representative = None
+            if index is not None:
+                position = index.add("\n".join(slide['content']))
+                if position != len(changed):
+                    representative = changed[position]
+                    duplicates.append(slide['slide_number'])
+            changed.append(structured)
+            shares = representative if representative is not None and representative['needs_image'] else None
+            return structured, fingerprint, False, shares
+
+        def acquire_image(item):
+            slide, _, reused, shares = item
+            if not reused:
+                if not slide['needs_image']:
+                    slide['image_path'] = None
+                elif shares is None:
+                    self._attach_image(slide, self._fetch_image(slide))
+            return item
+
+        def lay_out(item):
+            slide, _, _, shares = item
+            if shares is not None and slide['needs_image']:
+                self._share_image(slide, shares)
+            with self.metrics.slide(slide['slide_number'], 'layout'):
+                self._populate_template_slide(prs.slides.add_slide(layout), slide, roles)
+            return item
+
+        pipeline = StagePipeline([
+            ('structuring', structure),
+            ('image_acquisition', acquire_image, max(1, self.image_workers)),
+            ('layout', lay_out),
+        ], queue_size=queue_size, metrics=self.metrics)
+        with self.metrics.stage('pipeline'):
+            results = list(pipeline.run(slides_content))
+        with self.metrics.stage('saving'):
+            prs.save(output_pptx_path)
+
+        if incremental:
+            reused = sum(1 for _, _, was_reused, _ in results if was_reused)
+            self.metrics.increment('slides_reused', reused)
+            print(f"♻️  Reused {reused} unchanged slides, rebuilt {len(results) - reused}")
+        if index is not None:
+            self.metrics.increment('near_duplicate_slides', len(duplicates))
+            if duplicates:
+                print(f"🪞 {len(duplicates)} near-duplicate slides shared their representative's image")
+        return [slide for slide, _, _, _ in results], [fingerprint for _, fingerprint, _, _ in results]
+
+    def process_presentation(self, input_pptx_path, output_pptx_path="enhanced_presentation.pptx", records=None,
+                             incremental=False, metrics_path=None, dedup_threshold=None, pipelined=False,
+                             queue_size=8):
+        """Main method to process the entire presentation using template"""
+        if pipelined:
+            slides_with_images, fingerprints = self._process_pipelined(
+                input_pptx_path, output_pptx_path, records, incremental, dedup_threshold, queue_size)
+        else:
+            slides_with_images, fingerprints = self._process_sequential(
+                input_pptx_path, output_pptx_path, records, incremental, dedup_threshold)
+        final_presentation_path = output_pptx_path
+        if incremental:
+            with self.metrics.stage('manifest'):
+                self._save_manifest(output_pptx_path, slides_with_images, fingerprints)
         
         print(f"✅ Enhanced presentation created: {final_presentation_path}")
         
         # Print summary
         image_slides = sum(1 for slide in slides_with_images if slide['needs_image'])
-        print(f"📊 Processed {len(slides_content)} slides")
+        print(f"📊 Processed {len(slides_with_images)} slides")
         print(f"🖼️  Generated images for {image_slides} slides")
         print(f"🎨 Used template: {self.template_path}")
+        if self.image_cache is not None:
+            stats = self.image_cache.stats()
+            print(f"🗃️ Image cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
         
         # Delete the pics folder after processing is complete
-        if os.path.exists("pics"):
+        if os.path.exists(self.image_dir):
             try:
-                shutil.rmtree("pics")
+                shutil.rmtree(self.image_dir)
                 print("🗑️  Temporary image files cleaned up")
             except Exception as e:
                 print(f"⚠️ Warning: Could not remove temporary images: {e}")
+        
+        print(self.metrics.summary())
+        if metrics_path:  # Prometheus text for a .prom path, JSON otherwise
+            if metrics_path.endswith(".prom"):
+                with open(metrics_path, "w", encoding="utf-8") as f:
+                    f.write(self.metrics.to_prometheus())
+            else:
+                self.metrics.to_json(metrics_path)
     
         return final_presentation_path
 
@@ -781,16 +1295,21 @@ class PowerPointProcessor:
 # Usage example
 if __name__ == "__main__":
     # Initialize processor with API keys and template path
-    processor = PowerPointProcessor(template_path="trimmedTemplate.pptx")
+    processor = PowerPointProcessor(template_path="trimmedTemplate.pptx", image_cache=ImageCache("image_cache"),
+                                    in_memory=True)
     
     # Process presentation
     input_file = "trimmed_output_15percent.pptx"  # Your input file
     
     output_file = "enhanced_presentation.pptx"
     
+    # SLIDE_DEDUP_THRESHOLD=0.9 lets near-duplicate slides share one image
+    dedup_threshold = os.getenv("SLIDE_DEDUP_THRESHOLD")
+    dedup_threshold = float(dedup_threshold) if dedup_threshold else None
+    
     if os.path.exists(input_file):
         try:
-            result = processor.process_presentation(input_file, output_file)
+            result = processor.process_presentation(input_file, output_file, dedup_threshold=dedup_threshold)
             print(f"\n🎉 Success! Enhanced presentation saved as: {result}")
         except Exception as e:
             print(f"❌ Error processing presentation: {e}")
@@ -812,7 +1331,8 @@ if __name__ == "__main__":
         
         # Process the sample
         try:
-            result = processor.process_presentation("sample_presentation.pptx", "enhanced_sample.pptx")
+            result = processor.process_presentation("sample_presentation.pptx", "enhanced_sample.pptx",
+                                                    dedup_threshold=0.9)
             print(f"\n🎉 Sample processed successfully: {result}")
         except Exception as e:
             print(f"❌ Error processing sample: {e}")
@@ -0,0 +1,142 @@
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _peak_rss_bytes():
+    """Peak resident set size of this process so far, when the platform reports it"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PipelineMetrics:
+    """Stage and per-slide timers, counters, queue depths and memory peaks for one pipeline run"""
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory  # Also record each stage's tracemalloc heap peak
+        self.stages = {}
+        self.slides = {}
+        self.counters = {}
+        self.queues = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        """Time a whole pipeline stage; stages should not nest"""
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            heap_peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+            with self._lock:
+                stage = self.stages.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+                stage['calls'] += 1
+                stage['wall_seconds'] += wall
+                stage['cpu_seconds'] += cpu
+                if heap_peak is not None:
+                    stage['peak_heap_bytes'] = max(stage.get('peak_heap_bytes', 0), heap_peak)
+
+    @contextmanager
+    def slide(self, slide_number, stage):
+        """Time one slide's share of a stage; CPU time is for the calling thread"""
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            with self._lock:
+                timings = self.slides.setdefault(slide_number, {}).setdefault(
+                    stage, {'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+                timings['wall_seconds'] += wall
+                timings['cpu_seconds'] += cpu
+
+    def increment(self, name, amount=1):
+        """Add amount to a named counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe_queue(self, name, depth):
+        """Sample how many entries a pipeline queue holds"""
+        with self._lock:
+            stats = self.queues.setdefault(name, {'samples': 0, 'max_depth': 0, 'total_depth': 0})
+            stats['samples'] += 1
+            stats['max_depth'] = max(stats['max_depth'], depth)
+            stats['total_depth'] += depth
+
+    def report(self):
+        """Return all measurements as a JSON-serializable dict"""
+        with self._lock:
+            return {
+                'total_wall_seconds': time.perf_counter() - self._started,
+                'peak_rss_bytes': _peak_rss_bytes(),
+                'stages': {name: dict(stage) for name, stage in self.stages.items()},
+                'counters': dict(self.counters),
+                'queues': {
+                    name: {'samples': stats['samples'], 'max_depth': stats['max_depth'],
+                           'mean_depth': stats['total_depth'] / stats['samples']}
+                    for name, stats in self.queues.items()
+                },
+                'slides': {
+                    str(number): {stage: dict(timing) for stage, timing in stages.items()}
+                    for number, stages in sorted(self.slides.items())
+                },
+            }
+
+    def to_json(self, path=None):
+        """Return the report as JSON, also writing it to path if given"""
+        text = json.dumps(self.report(), indent=2)
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+    def to_prometheus(self, prefix="pptx_pipeline"):
+        """Return stage timers, counters and memory in Prometheus text format"""
+        report = self.report()
+        lines = []
+        for metric, key in [("stage_wall_seconds", "wall_seconds"), ("stage_cpu_seconds", "cpu_seconds"),
+                            ("stage_calls_total", "calls")]:
+            lines.append(f"# TYPE {prefix}_{metric} {'counter' if key == 'calls' else 'gauge'}")
+            for name, stage in report['stages'].items():
+                lines.append(f'{prefix}_{metric}{{stage="{name}"}} {stage[key]}')
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, value in report['counters'].items():
+            lines.append(f'{prefix}_events_total{{name="{name}"}} {value}')
+        for metric in ["max_depth", "mean_depth"]:
+            if report['queues']:
+                lines.append(f"# TYPE {prefix}_queue_{metric} gauge")
+            for name, stats in report['queues'].items():
+                lines.append(f'{prefix}_queue_{metric}{{queue="{name}"}} {stats[metric]}')
+        if report['peak_rss_bytes'] is not None:
+            lines.append(f"# TYPE {prefix}_peak_rss_bytes gauge")
+            lines.append(f"{prefix}_peak_rss_bytes {report['peak_rss_bytes']}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """One line per stage and per pipeline queue, for the console"""
+        with self._lock:
+            lines = [f"⏱️  {name}: {stage['wall_seconds']:.2f}s wall, {stage['cpu_seconds']:.2f}s CPU"
+                     for name, stage in self.stages.items()]
+            lines += [f"📥 {name}: mean depth {stats['total_depth'] / stats['samples']:.1f}, "
+                      f"max {stats['max_depth']}" for name, stats in self.queues.items()]
+        return "\n".join(lines)
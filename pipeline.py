@@ -0,0 +1,121 @@
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, NamedTuple
+
+_DONE = object()
+
+
+class PipelineStage(NamedTuple):
+    """One step of a StagePipeline; func turns an item into its next form"""
+    name: str
+    func: Callable
+    workers: int = 1
+
+
+class _Failed:
+    """Carries an exception down the queues to the consumer"""
+    def __init__(self, error):
+        self.error = error
+
+
+def _resolve(entry):
+    """Wait for an entry that a multi-worker stage handed on as a Future"""
+    if not isinstance(entry, Future):
+        return entry
+    try:
+        return entry.result()
+    except BaseException as e:
+        return _Failed(e)
+
+
+class StagePipeline:
+    """Runs items through a chain of stages on threads joined by bounded queues, keeping their order"""
+    def __init__(self, stages, queue_size=8, metrics=None, poll_interval=0.1):
+        self.stages = [PipelineStage(*stage) for stage in stages]
+        self.queue_size = queue_size
+        self.metrics = metrics
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+
+    def _put(self, q, name, entry):
+        """Put entry on q unless the pipeline stops first; return whether it was put"""
+        # A full queue holds the stages before it back. Depths sampled here show the bottleneck:
+        # the queue in front of it stays full and the one after it stays empty
+        while not self._stop.is_set():
+            try:
+                q.put(entry, timeout=self.poll_interval)
+            except queue.Full:
+                continue
+            if self.metrics:
+                self.metrics.observe_queue(name, q.qsize())
+            return True
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _feed(self, items, out, name):
+        try:
+            for item in items:
+                if not self._put(out, name, item):
+                    return
+        except BaseException as e:
+            self._put(out, name, _Failed(e))
+            return
+        self._put(out, name, _DONE)
+
+    def _work(self, stage, inbox, out, name):
+        executor = ThreadPoolExecutor(stage.workers) if stage.workers > 1 else None
+        try:
+            while True:
+                entry = _resolve(self._get(inbox))
+                if entry is _DONE or isinstance(entry, _Failed):
+                    self._put(out, name, entry)
+                    return
+                if executor:
+                    # Futures are passed on in arrival order, so items overlap but stay in order
+                    result = executor.submit(stage.func, entry)
+                else:
+                    try:
+                        result = stage.func(entry)
+                    except BaseException as e:
+                        result = _Failed(e)
+                if not self._put(out, name, result) or isinstance(result, _Failed):
+                    return
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=self._stop.is_set())
+
+    def run(self, items):
+        """Yield each of items after it has been through every stage, in input order"""
+        self._stop.clear()
+        names = ["source"] + [stage.name for stage in self.stages] + ["output"]
+        # A multi-worker stage's output queue also holds the items its workers are busy with
+        queues = [queue.Queue(self.queue_size)]
+        queues += [queue.Queue(self.queue_size + (stage.workers if stage.workers > 1 else 0))
+                   for stage in self.stages]
+        queue_names = [f"{a}->{b}" for a, b in zip(names, names[1:])]
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0], queue_names[0]), daemon=True)]
+        for i, stage in enumerate(self.stages):
+            threads.append(threading.Thread(target=self._work, args=(stage, queues[i], queues[i + 1],
+                                                                     queue_names[i + 1]), daemon=True))
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                entry = _resolve(self._get(queues[-1]))
+                if entry is _DONE:
+                    return
+                if isinstance(entry, _Failed):  # An exception in any stage stops the pipeline
+                    raise entry.error
+                yield entry
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,100 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import openai
+
+
+class TokenBucket:
+    """Thread-safe token bucket that paces outgoing API requests"""
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+def is_retryable(error):
+    """True for throttling, timeouts, connection failures and server errors"""
+    if isinstance(error, (openai.APIConnectionError, ConnectionError, TimeoutError)):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status in RETRYABLE_STATUS or status >= 500)
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait before retrying, if it said"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class Backoff:
+    """Retry a call with exponential backoff and jitter, honoring Retry-After"""
+    def __init__(self, max_attempts=5, base_delay=1.0, max_delay=60.0, jitter=0.5, retryable=is_retryable,
+                 sleep=time.sleep):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retryable = retryable
+        self.sleep = sleep
+
+    def delay(self, attempt, error=None):
+        """Seconds to wait after the given failed attempt"""
+        # A server-requested wait wins; otherwise base_delay * 2**attempt, scaled down by up to
+        # jitter so concurrent workers do not retry in lockstep. Both are capped at max_delay
+        requested = retry_after(error) if error is not None else None
+        if requested is not None:
+            return min(requested, self.max_delay)
+        delay = min(self.base_delay * 2 ** attempt, self.max_delay)
+        return delay * (1 - self.jitter * random.random())
+
+    def call(self, func, *args, on_retry=None, **kwargs):
+        """Return func(*args, **kwargs), retrying retryable errors; re-raises the last one"""
+        for attempt in range(self.max_attempts):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_attempts - 1 or not self.retryable(e):
+                    raise
+                delay = self.delay(attempt, e)
+                if on_retry:
+                    on_retry(attempt, e, delay)
+                self.sleep(delay)
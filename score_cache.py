@@ -0,0 +1,93 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ScoreCache:
+    """Persistent SQLite cache of slide scores, evicting the least recently used past max_entries"""
+    def __init__(self, path="score_cache.sqlite3", model="gpt-3.5-turbo", prompt_version=1, max_entries=100_000):
+        self.path = path
+        self.model = model
+        self.prompt_version = prompt_version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scores ("
+                "key TEXT PRIMARY KEY, score INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)")
+
+    @contextmanager
+    def _connect(self):
+        # A fresh connection per operation keeps the cache usable from any thread or process
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def key(self, text):
+        """Return the cache key for a slide's text"""
+        # The model and prompt version are part of the key, so changing either invalidates old scores
+        normalized = " ".join(text.split())
+        payload = f"{self.model}\0{self.prompt_version}\0{normalized}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts):
+        """Look up scores for texts, returning {position: score} for the hits"""
+        keys = [self.key(text) for text in texts]
+        found = {}
+        with self._connect() as conn:
+            unique_keys = list(set(keys))
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, score FROM scores WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                )
+                found.update(rows)
+            if found:
+                conn.executemany(
+                    "UPDATE scores SET last_used = ? WHERE key = ?",
+                    [(time.time(), key) for key in found],
+                )
+
+        hits = {i: found[key] for i, key in enumerate(keys) if key in found}
+        with self._lock:
+            self.hits += len(hits)
+            self.misses += len(keys) - len(hits)
+        return hits
+
+    def put_many(self, items):
+        """Store (text, score) pairs and evict the least recently used overflow"""
+        now = time.time()
+        rows = [(self.key(text), score, now) for text, score in items]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO scores (key, score, last_used) VALUES (?, ?, ?)", rows
+            )
+            conn.execute(
+                "DELETE FROM scores WHERE key IN ("
+                "SELECT key FROM scores ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self):
+        """Return hit/miss counters and the current number of cached scores"""
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+import threading
+
+
+class ScoreJournal:
+    """Append-only JSONL checkpoint of the scoring batches a run has finished"""
+    def __init__(self, path, model="gpt-3.5-turbo", prompt_version=1):
+        self.path = path
+        self.model = model
+        self.prompt_version = prompt_version
+        self.scores = {}
+        self.batches = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def key(self, text):
+        """Return the journal key for a slide's text"""
+        return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            lines = f.read().split("\n")
+        if lines[-1]:
+            # Finish a torn last line so the next record starts on its own line
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n")
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:  # Torn by a crash mid-write
+                continue
+            if entry.get("model") != self.model or entry.get("prompt_version") != self.prompt_version:
+                continue
+            self.scores.update(zip(entry["keys"], entry["scores"]))
+            self.batches += 1
+
+    def get(self, text):
+        """Return the recorded score for text, or None"""
+        return self.scores.get(self.key(text))
+
+    def record(self, indices, texts, scores):
+        """Append one finished batch: the slide indices, their texts and their scores"""
+        keys = [self.key(text) for text in texts]
+        entry = {
+            "model": self.model,
+            "prompt_version": self.prompt_version,
+            "indices": list(indices),
+            "keys": keys,
+            "scores": list(scores),
+        }
+        # Flushed straight away, so a crash loses at most the batches still in flight
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.scores.update(zip(keys, scores))
+            self.batches += 1
+
+    def remove(self):
+        """Delete the journal once its run has completed"""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
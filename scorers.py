@@ -0,0 +1,138 @@
+import re
+import threading
+
+import numpy as np
+
+from dedup import NearDuplicateIndex
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9'%.-]*[a-z0-9%]|[a-z0-9]")
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have in into is it its of on or our so that the their "
+    "this to was we were will with you your".split()
+)
+
+
+class SlideScorer:
+    """Turns slide texts into (index, score) pairs in slide order, higher meaning more important"""
+    name = "base"
+    resumable = False  # Resumable scorers checkpoint to a ScoreJournal passed to score()
+
+    def score(self, slide_texts, metrics=None, journal=None, sink=None):
+        """Score every slide, handing each group of pairs to sink as soon as they are known"""
+        raise NotImplementedError
+
+
+class LocalScorer(SlideScorer):
+    """Offline scorer ranking slides from 0 to 10 by BM25-weighted centrality to the deck"""
+    name = "local"
+
+    def __init__(self, k1=1.5, b=0.75, min_terms=8):
+        self.k1 = k1
+        self.b = b
+        self.min_terms = min_terms
+
+    def _tokenize(self, slide_texts):
+        """Return parallel arrays of slide index, term id and count for each distinct (slide, term)"""
+        vocabulary = {}
+        doc_ids = []
+        term_ids = []
+        count = 0
+        for count, text in enumerate(slide_texts, 1):
+            for token in TOKEN_PATTERN.findall(text.lower()):
+                if token not in STOP_WORDS:
+                    doc_ids.append(count - 1)
+                    term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+        if not term_ids:
+            return count, len(vocabulary), np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+        codes = np.asarray(doc_ids, np.int64) * len(vocabulary) + np.asarray(term_ids, np.int64)
+        codes, tf = np.unique(codes, return_counts=True)
+        return count, len(vocabulary), codes // len(vocabulary), codes % len(vocabulary), tf.astype(np.float64)
+
+    def score_array(self, slide_texts):
+        """Return a NumPy array of scores, one per slide"""
+        n_docs, n_terms, docs, terms, tf = self._tokenize(slide_texts)
+        if not len(tf):
+            return np.zeros(n_docs)
+
+        doc_length = np.bincount(docs, weights=tf, minlength=n_docs)
+        df = np.bincount(terms, minlength=n_terms)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        length_norm = 1 - self.b + self.b * doc_length / doc_length.mean()
+        weights = idf[terms] * tf * (self.k1 + 1) / (tf + self.k1 * length_norm[docs])
+
+        # Each slide's L2-normalized BM25 vector is scored by its cosine to the deck's centroid, so
+        # slides carrying the main themes rank first; all of it runs over the sparse (slide, term)
+        # entries without building a deck-by-vocabulary matrix
+        norms = np.sqrt(np.bincount(docs, weights=weights ** 2, minlength=n_docs))
+        weights /= norms[docs]
+        centroid = np.bincount(terms, weights=weights, minlength=n_terms) / n_docs
+        centrality = np.bincount(docs, weights=weights * centroid[terms], minlength=n_docs)
+
+        # Slides with fewer than min_terms distinct terms are scaled down
+        distinct_terms = np.bincount(docs, minlength=n_docs)
+        centrality *= np.minimum(1.0, distinct_terms / self.min_terms)
+        top = centrality.max()
+        return centrality * (10 / top) if top > 0 else centrality
+
+    def score(self, slide_texts, metrics=None, journal=None, sink=None):
+        scores = [(i, round(float(score), 4)) for i, score in enumerate(self.score_array(slide_texts))]
+        if metrics:
+            metrics.increment("slides_scored", len(scores))
+        if sink:
+            sink(scores)
+        return scores
+
+
+class DedupScorer(SlideScorer):
+    """Wraps a scorer so only one slide of each near-duplicate cluster is scored; the rest share its score"""
+    def __init__(self, scorer, threshold=0.9):
+        self.scorer = scorer
+        self.threshold = threshold
+        self.name = scorer.name
+        self.resumable = scorer.resumable
+
+    def score(self, slide_texts, metrics=None, journal=None, sink=None):
+        index = NearDuplicateIndex(self.threshold)
+        positions = []
+        # Duplicates waiting for their representative's score, and the scores known so far
+        waiting = {}
+        known = {}
+        lock = threading.Lock()
+
+        def representatives():
+            for i, text in enumerate(slide_texts):
+                representative = index.add(text)
+                if representative == i:
+                    positions.append(i)
+                    yield text
+                elif sink:
+                    with lock:
+                        score = known.get(representative)
+                        if score is None:
+                            waiting.setdefault(representative, []).append(i)
+                    if score is not None:
+                        sink([(i, score)])
+
+        def forward(scores):
+            # Map the wrapped scorer's positions back to slides, adding each one's duplicates
+            pairs = []
+            with lock:
+                for j, score in scores:
+                    known[positions[j]] = score
+                    pairs.append((positions[j], score))
+                    pairs.extend((duplicate, score) for duplicate in waiting.pop(positions[j], ()))
+            sink(pairs)
+
+        inner = self.scorer.score(representatives(), metrics, journal, forward if sink else None)
+        scored = {positions[j]: score for j, score in inner}
+        scores = [(i, scored[representative]) for i, representative in enumerate(index.representatives)
+                  if representative in scored]
+        if index.duplicates:
+            print(f"🪞 {index.duplicates} near-duplicate slides took their representative's score")
+        if metrics:
+            metrics.increment("near_duplicate_slides", index.duplicates)
+            # The wrapped scorer only counted representatives
+            metrics.increment("slides_scored", len(scores) - len(scored))
+            metrics.increment("slides_unscored", len(index.representatives) - len(positions)
+                              - (len(scores) - len(scored)))
+        return scores
@@ -0,0 +1,64 @@
+import heapq
+import threading
+
+
+class SlideSelector:
+    """Chooses the slides to keep, from top_k, top_percent and/or threshold, while their scores stream in"""
+    def __init__(self, total_slides=None, top_k=None, top_percent=None, threshold=None, keep_first=False,
+                 keep_last=False):
+        if top_k is not None and top_percent is not None:
+            raise ValueError("choose top_k or top_percent, not both")
+        if top_percent is not None:  # Slides never scored still count towards total_slides
+            if total_slides is None:
+                raise ValueError("top_percent needs total_slides")
+            top_k = int(total_slides * top_percent)
+        if keep_last and total_slides is None:
+            raise ValueError("keep_last needs total_slides")
+        self.total_slides = total_slides
+        self.top_k = top_k
+        self.threshold = threshold
+        self.keep_first = keep_first
+        self.keep_last = keep_last
+        self.seen = 0
+        # Bounded min-heap of the best k so far, O(log k) per score; (score, -index) makes the root the
+        # worst slide kept and breaks ties towards the lower index, whatever order batches finish in
+        self._heap = []
+        self._kept = []  # threshold-only selection
+        self._offered = set()  # Only an index's first score counts; O(n) on top of the O(k) heap
+        self._lock = threading.Lock()  # add() and add_many() may be called from several threads
+
+    def add(self, index, score):
+        """Offer one slide's score"""
+        self.add_many([(index, score)])
+
+    def add_many(self, scores):
+        """Offer (index, score) pairs, e.g. one finished scoring batch"""
+        threshold = self.threshold
+        heap = self._heap
+        with self._lock:
+            for index, score in scores:
+                if index in self._offered:
+                    continue
+                self._offered.add(index)
+                self.seen += 1
+                if threshold is not None and score < threshold:
+                    continue
+                if self.top_k is None:
+                    self._kept.append(index)
+                elif len(heap) < self.top_k:
+                    heapq.heappush(heap, (score, -index))
+                elif self.top_k and (score, -index) > heap[0]:
+                    heapq.heapreplace(heap, (score, -index))
+
+    def select(self):
+        """Return the kept slide indices in deck order"""
+        with self._lock:
+            if self.top_k is None:
+                keep = set(self._kept)
+            else:
+                keep = {-negative_index for _, negative_index in self._heap}
+        if self.keep_first and (self.total_slides is None or self.total_slides > 0):
+            keep.add(0)
+        if self.keep_last and self.total_slides:
+            keep.add(self.total_slides - 1)
+        return sorted(keep)
@@ -0,0 +1,74 @@
+import os
+from io import BytesIO
+
+from pptx import Presentation
+from pptx.enum.shapes import PP_PLACEHOLDER
+
+TITLE_TYPES = (PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE)
+BODY_TYPES = (PP_PLACEHOLDER.BODY, PP_PLACEHOLDER.OBJECT)
+
+
+def placeholder_roles(shapes_owner):
+    """Map 'title', 'body' and 'picture' to placeholder idx for a layout or slide"""
+    roles = {}
+    for placeholder in shapes_owner.placeholders:
+        ph_type = placeholder.placeholder_format.type
+        if ph_type in TITLE_TYPES:
+            role = 'title'
+        elif ph_type in BODY_TYPES:
+            role = 'body'
+        elif ph_type == PP_PLACEHOLDER.PICTURE:
+            role = 'picture'
+        else:
+            continue
+        roles.setdefault(role, placeholder.placeholder_format.idx)
+    return roles
+
+
+class TemplateIndex:
+    """A template loaded once, stripped of its slides, with layouts indexed by role"""
+    def __init__(self, template_path):
+        self.template_path = template_path
+        prs = self._load()
+
+        # Drop the relationship as well as the id so the slide part is not saved
+        sld_id_lst = prs.slides._sldIdLst
+        for sld_id in list(sld_id_lst):
+            prs.part.drop_rel(sld_id.rId)
+            sld_id_lst.remove(sld_id)
+
+        # Kept as bytes, so new_presentation() only has to parse it
+        buffer = BytesIO()
+        prs.save(buffer)
+        self._blob = buffer.getvalue()
+
+        self.layout_roles = [placeholder_roles(layout) for layout in prs.slide_layouts]
+        self.content_layout_index = self._choose_content_layout()
+        print(f"📝 Available slide layouts: {len(self.layout_roles)}")
+
+    def _load(self):
+        try:
+            if os.path.exists(self.template_path):
+                prs = Presentation(self.template_path)
+                print(f"✅ Loaded template: {self.template_path}")
+                return prs
+            print(f"⚠️ Template not found: {self.template_path}, creating new presentation")
+        except Exception as e:
+            print(f"⚠️ Error loading template: {e}, creating new presentation")
+        return Presentation()
+
+    def _choose_content_layout(self):
+        """Prefer the first layout with both title and body placeholders"""
+        for i, roles in enumerate(self.layout_roles):
+            if 'title' in roles and 'body' in roles:
+                return i
+        # Otherwise the usual content layout position, or the only layout
+        return 1 if len(self.layout_roles) > 1 else 0
+
+    def new_presentation(self):
+        """Return a fresh, slide-less Presentation of the template"""
+        return Presentation(BytesIO(self._blob))
+
+    @property
+    def content_roles(self):
+        return self.layout_roles[self.content_layout_index]
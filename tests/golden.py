@@ -0,0 +1,74 @@
+"""Golden slide contents and the legacy implementations the classifier and formatter are pinned to"""
+import random
+import re
+
+from main2 import PowerPointProcessor
+
+
+class LegacyStructuring(PowerPointProcessor):
+    """PowerPointProcessor with the original regex-per-call text classifiers"""
+    def _is_tabular_data(self, text):
+        patterns = [r'\t.*\t', r'\|.*\|', r':\s*\d+', r'\d+\.\d+%']
+        return any(re.search(pattern, text) for pattern in patterns)
+
+    def _has_bullet_points(self, text, scan=None):
+        patterns = [r'^[\•\-\*]\s', r'^\d+\.\s', r'^[a-zA-Z]\.\s']
+        lines = text.split('\n')
+        if not lines:
+            return False
+        bullet_lines = sum(1 for line in lines if any(re.match(pattern, line.strip()) for pattern in patterns))
+        return bullet_lines > len(lines) * 0.3
+
+    def _extract_bullet_points(self, text, scan=None):
+        lines = text.split('\n')
+        points = []
+        for line in lines:
+            line = line.strip()
+            if re.match(r'^[\•\-\*]\s', line):
+                points.append(re.sub(r'^[\•\-\*]\s', '', line))
+            elif re.match(r'^\d+\.\s', line):
+                points.append(re.sub(r'^\d+\.\s', '', line))
+            elif re.match(r'^[a-zA-Z]\.\s', line):
+                points.append(re.sub(r'^[a-zA-Z]\.\s', '', line))
+            elif line and not any(re.match(r'^[\•\-\*]\s|^\d+\.\s|^[a-zA-Z]\.\s', l.strip()) for l in lines[:max(0, lines.index(line))]):
+                continue
+            elif line:
+                points.append(line)
+        return points if points else ["Content point"]
+
+
+def golden_slides(count=2000, seed=1):
+    """Random slide contents exercising every classifier branch"""
+    rng = random.Random(seed)
+    fragments = ["Overview", "Revenue: 42", "growth 12.5%", "a\tb\tc", "x | y | z", "• point one",
+                 "- dash item", "* star item", "1. first", "12. twelfth", "a. letter", "B. Letter",
+                 "plain sentence here.", "", "Header", "Header", "-nospace", "3.no space", "•"]
+    slides = []
+    for _ in range(count):
+        content = []
+        for _ in range(rng.randint(0, 4)):
+            content.append("\n".join(rng.choice(fragments) for _ in range(rng.randint(1, 6))).strip())
+        slides.append([c for c in content if c])
+    return slides
+
+
+def legacy_text_formatting(text):
+    """The original character-by-character **bold** splitter"""
+    if "**" in text:
+        parts = []
+        is_bold = False
+        current_part = ""
+        i = 0
+        while i < len(text):
+            if i + 1 < len(text) and text[i:i+2] == "**":
+                parts.append((current_part, is_bold))
+                current_part = ""
+                is_bold = not is_bold
+                i += 2
+            else:
+                current_part += text[i]
+                i += 1
+        if current_part:
+            parts.append((current_part, is_bold))
+        return parts
+    return [(text, False)]
@@ -0,0 +1,50 @@
+"""Checks that batch runs keep each deck's outputs apart"""
+import os
+
+import pytest
+from pptx import Presentation
+
+from batch import find_decks, output_names, run_batch
+
+
+def _deck(path, title):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    prs = Presentation()
+    for i, topic in enumerate(["revenue", "hiring", "roadmap", "pricing", "security", "support", "partners",
+                               "marketing", "churn", "budget"]):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"{title} {i}"
+        slide.placeholders[1].text_frame.text = f"{title} plan for {topic} in quarter {i % 4 + 1}"
+    prs.save(path)
+    return str(path)
+
+
+def test_same_named_decks_get_their_own_outputs(tmp_path):
+    decks = [_deck(tmp_path / "a" / "deck.pptx", "Alpha"), _deck(tmp_path / "b" / "deck.pptx", "Beta")]
+    summary = run_batch(decks, str(tmp_path / "out"), mode="trim", workers=2, scorer="local")
+    assert summary["failed"] == 0
+    outputs = [result["outputs"]["trimmed"] for result in summary["decks"]]
+    assert [os.path.basename(path) for path in outputs] == ["a_deck_trimmed.pptx", "b_deck_trimmed.pptx"]
+    for output, title in zip(outputs, ["Alpha", "Beta"]):
+        titles = [slide.shapes.title.text for slide in Presentation(output).slides]
+        assert titles and all(text.startswith(title) for text in titles)
+
+
+def test_decks_in_one_directory_keep_their_names(tmp_path):
+    assert output_names([str(tmp_path / "x.pptx"), str(tmp_path / "y.pptx")]) == ["x", "y"]
+
+
+def test_repeated_deck_is_rejected(tmp_path):
+    deck = str(tmp_path / "deck.pptx")
+    with pytest.raises(ValueError):
+        output_names([deck, deck])
+
+
+def test_manifest_paths_resolve_against_the_manifest(tmp_path, monkeypatch):
+    (tmp_path / "decks").mkdir()
+    (tmp_path / "decks" / "list.txt").write_text("a.pptx\n# skipped\nsub/b.pptx\n", encoding="utf-8")
+    (tmp_path / "decks" / "list.json").write_text('["a.pptx"]', encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    assert find_decks(os.path.join("decks", "list.txt")) == [os.path.join("decks", "a.pptx"),
+                                                            os.path.join("decks", "sub", "b.pptx")]
+    assert find_decks(str(tmp_path / "decks" / "list.json")) == [str(tmp_path / "decks" / "a.pptx")]
@@ -0,0 +1,49 @@
+"""Packing checks for BatchPlanner at the token budget boundary"""
+import pytest
+
+from batch_planner import BatchPlanner
+
+
+class CharEstimator:
+    """One token per character, so budgets are easy to reason about"""
+    def count(self, text):
+        return len(text)
+
+    def truncate(self, text, max_tokens):
+        return text[:max_tokens]
+
+
+def _planner(**kwargs):
+    return BatchPlanner(estimator=CharEstimator(), **kwargs)
+
+
+def test_slides_filling_the_budget_exactly_share_a_batch():
+    planner = _planner(max_slides=10, token_budget=30, prompt_overhead=4, slide_overhead=3)
+    assert planner.add(0, "x" * 10) is None  # 4 + 13
+    assert planner.add(1, "x" * 10) is None  # 4 + 13 + 13 == 30
+    assert planner.add(2, "x") == [(0, "x" * 10), (1, "x" * 10)]
+    assert planner.flush() == [(2, "x")]
+
+
+def test_one_token_over_the_budget_starts_a_new_batch():
+    planner = _planner(max_slides=10, token_budget=30, prompt_overhead=4, slide_overhead=3)
+    planner.add(0, "x" * 10)
+    assert planner.add(1, "x" * 11) == [(0, "x" * 10)]
+    assert planner.flush() == [(1, "x" * 11)]
+
+
+def test_max_slides_caps_a_batch_under_budget():
+    planner = _planner(max_slides=2, token_budget=1000)
+    assert [planner.add(i, "x") for i in range(3)] == [None, None, [(0, "x"), (1, "x")]]
+
+
+def test_slide_longer_than_a_request_is_truncated_to_fit():
+    planner = _planner(max_slides=10, token_budget=30, prompt_overhead=4, slide_overhead=3)
+    planner.add(0, "x" * 50)
+    assert planner.flush() == [(0, "x" * 23)]
+    assert planner.truncated == [0]
+
+
+def test_budget_without_room_for_slides_is_rejected():
+    with pytest.raises(ValueError):
+        _planner(token_budget=10, prompt_overhead=4, slide_overhead=6)
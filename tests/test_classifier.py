@@ -0,0 +1,86 @@
+"""Golden checks pinning the text classifier and image decisions to the legacy implementations"""
+import pytest
+
+from main2 import BOLD, CODE, DEFAULT_IMAGE_KEYWORDS, ITALIC, ImageKeywordMatcher, PowerPointProcessor
+from tests.golden import LegacyStructuring, golden_slides, legacy_text_formatting
+
+GOLDEN = golden_slides()
+
+
+@pytest.fixture(scope="module")
+def processor():
+    return PowerPointProcessor()
+
+
+def test_structuring_matches_legacy(processor):
+    legacy = LegacyStructuring()
+    mismatches = [content for content in GOLDEN
+                  if legacy._analyze_and_structure_text(content) != processor._analyze_and_structure_text(content)]
+    assert not mismatches
+
+
+def test_image_decisions_match_substring_scan(processor):
+    for content in GOLDEN:
+        structured = processor._analyze_and_structure_text(content)
+        text = str(structured).lower()
+        expected = (structured['type'] in ['table', 'bullet_list']
+                    or sum(1 for keyword in DEFAULT_IMAGE_KEYWORDS if keyword in text) >= 2)
+        assert processor.image_matcher.explain(structured)['needs_image'] == expected, content
+
+
+def test_deck_wide_matching_matches_per_slide(processor):
+    contents = [processor._analyze_and_structure_text(content) for content in GOLDEN]
+    expected = [processor.image_matcher.explain(content) for content in contents]
+    assert processor.image_matcher.explain_many(contents) == expected
+
+
+def test_deck_wide_matching_with_nul_in_slide_text(processor):
+    contents = [{'type': 'structured_text', 'content': "chart\0graph"},
+                {'type': 'structured_text', 'content': "da\0ta"},
+                {'type': 'structured_text', 'content': "business strategy"}]
+    decisions = processor.image_matcher.explain_many(contents)
+    assert decisions == [processor.image_matcher.explain(content) for content in contents]
+    assert [decision['needs_image'] for decision in decisions] == [True, False, True]
+
+
+def test_empty_keyword_list_matches_nothing():
+    matcher = ImageKeywordMatcher(keywords=[], threshold=1)
+    content = {'type': 'text', 'content': "business strategy chart"}
+    assert matcher.explain_many([content]) == [matcher.explain(content)]
+    assert not matcher.explain(content)['needs_image']
+
+
+@pytest.mark.parametrize("text", [
+    "plain text", "**bold** start", "end **bold**", "a **b** c **d** e", "**unclosed bold",
+    "revenue **grew** by **12%** this quarter",
+])
+def test_bold_runs_match_legacy(processor, text):
+    # The tokenizer drops the empty runs the legacy splitter emitted at markers
+    expected = [(part, bold) for part, bold in legacy_text_formatting(text) if part]
+    assert [(part, bool(style & 1)) for part, style in processor._process_text_formatting(text)] == expected
+
+
+def test_overlapping_and_prefix_keywords_are_all_counted():
+    matcher = ImageKeywordMatcher(keywords=["data", "dataset", "at", "set"], threshold=1)
+    text = "metadataset data"
+    expected = {keyword: sum(text.startswith(keyword, i) for i in range(len(text))) for keyword in matcher.keywords}
+    assert matcher.count(text) == {keyword: n for keyword, n in expected.items() if n}
+    assert matcher.count(text) == {"data": 2, "dataset": 1, "at": 2, "set": 1}
+
+
+@pytest.mark.parametrize("text, runs", [
+    ("an *italic* word", [("an ", 0), ("italic", ITALIC), (" word", 0)]),
+    ("a*b*c", [("a", 0), ("b", ITALIC), ("c", 0)]),
+    ("use `code` here", [("use ", 0), ("code", CODE), (" here", 0)]),
+    ("a \\* literal", [("a * literal", 0)]),
+    ("**bold \\*star\\***", [("bold *star*", BOLD)]),
+    ("**bold *both* bold**", [("bold ", BOLD), ("both", BOLD | ITALIC), (" bold", BOLD)]),
+    ("**bold `code`**", [("bold ", BOLD), ("code", BOLD | CODE)]),
+    ("*unclosed italic", [("*unclosed italic", 0)]),
+    ("* spaced, not italic *", [("* spaced, not italic *", 0)]),
+    ("`unclosed code", [("`unclosed code", 0)]),
+    ("**unclosed bold", [("unclosed bold", BOLD)]),
+    ("", [("", 0)]),
+])
+def test_italic_code_escapes_and_nesting(processor, text, runs):
+    assert processor._process_text_formatting(text) == runs
@@ -0,0 +1,49 @@
+"""Checks for the MinHash/LSH near-duplicate index"""
+import random
+
+import numpy as np
+import pytest
+
+from dedup import NearDuplicateIndex, cluster_near_duplicates
+
+WORDS = ["revenue", "growth", "market", "team", "quarter", "plan", "customer", "product", "launch", "risk",
+         "budget", "hiring", "roadmap", "pricing", "churn", "partner", "region", "target", "forecast", "margin"]
+
+
+def _slide(seed, length=60):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def _edited(text, position=30, word="zebra"):
+    words = text.split()
+    words[position] = word
+    return " ".join(words)
+
+
+def test_near_identical_slides_merge_and_distinct_ones_do_not():
+    first, other = _slide(1), _slide(2)
+    texts = [first, other, _edited(first), first.upper() + "!", _edited(other, 5, "giraffe")]
+    assert cluster_near_duplicates(texts, threshold=0.8) == [0, 1, 0, 0, 1]
+
+
+def test_distinct_slides_stay_apart():
+    texts = [_slide(seed) for seed in range(20)]
+    index = NearDuplicateIndex(threshold=0.5)
+    assert [index.add(text) for text in texts] == list(range(20))
+    assert index.duplicates == 0
+
+
+def test_threshold_is_inclusive():
+    first = _slide(3)
+    edited = _edited(first)
+    probe = NearDuplicateIndex()
+    similarity = float(np.mean(probe.signature(first) == probe.signature(edited)))
+    assert 0 < similarity < 1
+    assert cluster_near_duplicates([first, edited], threshold=similarity) == [0, 0]
+    assert cluster_near_duplicates([first, edited], threshold=similarity + 1e-9) == [0, 1]
+
+
+def test_bands_must_divide_permutations():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=64, bands=10)
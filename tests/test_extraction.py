@@ -0,0 +1,47 @@
+"""Checks that the streaming text extractor matches the python-pptx path"""
+import pytest
+from pptx import Presentation
+from pptx.util import Inches
+
+from extraction import count_slides, iter_slide_texts, load_deck
+from main import extract_slide_texts
+
+
+@pytest.fixture
+def deck(tmp_path):
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[1])
+    slide.shapes.title.text = "  Quarterly review  "
+    body = slide.placeholders[1].text_frame
+    body.text = "Revenue grew"
+    body.add_paragraph().text = "Costs fell"
+    body.paragraphs[1].add_line_break()
+    body.paragraphs[1].add_run().text = "after the move"
+
+    slide = prs.slides.add_slide(prs.slide_layouts[5])
+    slide.shapes.title.text = "Table and group"
+    slide.shapes.add_table(2, 2, Inches(1), Inches(2), Inches(4), Inches(1)).table.cell(0, 0).text = "cell"
+    group = slide.shapes.add_group_shape()
+    group.shapes.add_textbox(Inches(1), Inches(4), Inches(2), Inches(1)).text_frame.text = "grouped"
+    slide.shapes.add_textbox(Inches(5), Inches(4), Inches(2), Inches(1)).text_frame.text = "  "
+
+    prs.slides.add_slide(prs.slide_layouts[6])
+    path = str(tmp_path / "deck.pptx")
+    prs.save(path)
+    return path
+
+
+def test_streamed_texts_match_python_pptx(deck):
+    streamed = list(iter_slide_texts(deck))
+    _, records = load_deck(deck)
+    assert streamed == [record.texts for record in records]
+    assert ["\n".join(texts) for texts in streamed] == extract_slide_texts(Presentation(deck))
+    assert streamed[0] == ("Quarterly review", "Revenue grew\nCosts fell\vafter the move")
+    assert streamed[2] == ()
+    assert count_slides(deck) == 3
+
+
+def test_slides_are_yielded_lazily(deck):
+    slides = iter_slide_texts(deck)
+    assert next(slides)[0] == "Quarterly review"
+    slides.close()
@@ -0,0 +1,39 @@
+"""Eviction checks for the image cache"""
+import os
+
+from image_cache import ImageCache
+
+
+def _cached_bytes(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(directory) for name in names if name.endswith(".jpg"))
+
+
+def test_put_stays_within_max_bytes(tmp_path):
+    cache = ImageCache(str(tmp_path), max_bytes=1000)
+    for i in range(20):
+        cache.put("unsplash", f"prompt {i}", (800, 600), i, b"x" * 300)
+        assert _cached_bytes(tmp_path) <= 1000
+    assert len(cache.variants("unsplash", "prompt 19", (800, 600))) == 1
+
+
+def test_put_only_walks_when_over_budget(tmp_path, monkeypatch):
+    cache = ImageCache(str(tmp_path), max_bytes=1000)
+    walks = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: (walks.append(1), evict()))
+    for i in range(3):
+        cache.put("unsplash", f"prompt {i}", (800, 600), i, b"x" * 300)
+    assert len(walks) == 1  # The first put counts what is already on disk
+    cache.put("unsplash", "prompt 0", (800, 600), 0, b"x" * 300)  # Overwrites, same size
+    assert len(walks) == 1
+    cache.put("unsplash", "prompt 3", (800, 600), 3, b"x" * 300)
+    assert len(walks) == 2
+
+
+def test_first_put_counts_existing_files(tmp_path):
+    ImageCache(str(tmp_path), max_bytes=10000).put("unsplash", "old", (800, 600), 0, b"x" * 900)
+    cache = ImageCache(str(tmp_path), max_bytes=1000)
+    cache.put("unsplash", "new", (800, 600), 0, b"x" * 300)
+    assert _cached_bytes(tmp_path) <= 1000
+    assert cache.variants("unsplash", "new", (800, 600))
@@ -0,0 +1,33 @@
+"""Checks for incremental enhancement runs"""
+import os
+
+import pytest
+from pptx import Presentation
+
+from main2 import PowerPointProcessor
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "trimmedTemplate.pptx")
+
+
+@pytest.fixture
+def deck(tmp_path):
+    prs = Presentation()
+    for i in range(4):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Growth strategy {i}"
+        slide.placeholders[1].text_frame.text = "• revenue\n• hiring\n• roadmap"
+    path = str(tmp_path / "deck.pptx")
+    prs.save(path)
+    return path
+
+
+@pytest.mark.parametrize("in_memory", [True, False])
+def test_placeholder_images_are_reused_without_a_provider(deck, tmp_path, monkeypatch, in_memory):
+    monkeypatch.delenv("UNSPLASH_API_KEY", raising=False)
+    monkeypatch.delenv("OPEN_AI", raising=False)
+    output = str(tmp_path / "out.pptx")
+    for run in range(2):
+        processor = PowerPointProcessor(template_path=TEMPLATE, image_dir=str(tmp_path / "pics"),
+                                        in_memory=in_memory)
+        processor.process_presentation(deck, output, incremental=True)
+    assert processor.metrics.counters.get("slides_reused") == 4
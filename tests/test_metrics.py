@@ -0,0 +1,36 @@
+"""Export checks for PipelineMetrics"""
+import json
+
+from metrics import PipelineMetrics
+
+
+def _metrics():
+    metrics = PipelineMetrics()
+    with metrics.stage("scoring"):
+        pass
+    with metrics.stage("scoring"):
+        pass
+    metrics.increment("llm_calls", 3)
+    metrics.observe_queue("source->images", 2)
+    metrics.observe_queue("source->images", 4)
+    return metrics
+
+
+def test_json_report(tmp_path):
+    path = tmp_path / "metrics.json"
+    report = json.loads(_metrics().to_json(str(path)))
+    assert json.loads(path.read_text()) == report
+    assert report["stages"]["scoring"]["calls"] == 2
+    assert report["counters"] == {"llm_calls": 3}
+    assert report["queues"]["source->images"] == {"samples": 2, "max_depth": 4, "mean_depth": 3.0}
+
+
+def test_prometheus_text():
+    lines = _metrics().to_prometheus(prefix="test").splitlines()
+    assert "# TYPE test_stage_calls_total counter" in lines
+    assert 'test_stage_calls_total{stage="scoring"} 2' in lines
+    assert 'test_events_total{name="llm_calls"} 3' in lines
+    assert 'test_queue_max_depth{queue="source->images"} 4' in lines
+    assert 'test_queue_mean_depth{queue="source->images"} 3.0' in lines
+    samples = [line for line in lines if not line.startswith("#")]
+    assert all(len(line.rsplit(" ", 1)) == 2 for line in samples)
@@ -0,0 +1,81 @@
+"""Ordering, error and shutdown checks for StagePipeline"""
+import random
+import threading
+import time
+
+import pytest
+
+from metrics import PipelineMetrics
+from pipeline import StagePipeline
+
+
+def _jittered(func):
+    rng = random.Random(0)
+    lock = threading.Lock()
+
+    def stage(item):
+        with lock:
+            delay = rng.random() * 0.003
+        time.sleep(delay)
+        return func(item)
+    return stage
+
+
+def test_items_come_out_in_input_order():
+    metrics = PipelineMetrics()
+    pipeline = StagePipeline([("double", _jittered(lambda x: x * 2), 4), ("inc", _jittered(lambda x: x + 1))],
+                             queue_size=2, metrics=metrics)
+    assert list(pipeline.run(range(50))) == [x * 2 + 1 for x in range(50)]
+    assert set(metrics.queues) == {"source->double", "double->inc", "inc->output"}
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_stage_error_is_raised_from_run(workers):
+    def fail_on_five(x):
+        if x == 5:
+            raise ValueError("bad item")
+        return x
+
+    pipeline = StagePipeline([("check", fail_on_five, workers), ("copy", lambda x: x)])
+    results = []
+    with pytest.raises(ValueError, match="bad item"):
+        for item in pipeline.run(range(20)):
+            results.append(item)
+    assert results == [0, 1, 2, 3, 4]
+
+
+def test_source_error_is_raised_from_run():
+    def source():
+        yield 1
+        yield 2
+        raise OSError("deck unreadable")
+
+    pipeline = StagePipeline([("copy", lambda x: x)])
+    results = []
+    with pytest.raises(OSError, match="deck unreadable"):
+        for item in pipeline.run(source()):
+            results.append(item)
+    assert results == [1, 2]
+
+
+def test_closing_early_stops_every_thread():
+    pulled = []
+
+    def source():
+        for i in range(10_000):
+            pulled.append(i)
+            yield i
+
+    before = threading.active_count()
+    pipeline = StagePipeline([("slow", _jittered(lambda x: x), 2), ("copy", lambda x: x)],
+                             queue_size=2, poll_interval=0.01)
+    run = pipeline.run(source())
+    assert [next(run) for _ in range(3)] == [0, 1, 2]
+    run.close()
+    # Stage threads are joined by close(); pool workers finish the item they hold first
+    deadline = time.monotonic() + 1
+    while threading.active_count() > before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert threading.active_count() == before
+    # Bounded queues held the source back instead of draining it
+    assert len(pulled) < 50
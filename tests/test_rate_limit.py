@@ -0,0 +1,76 @@
+"""Checks for Retry-After parsing and which errors Backoff retries"""
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import openai
+import pytest
+
+from rate_limit import Backoff, is_retryable, retry_after
+
+
+def _status_error(status, headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status, request=request, headers=headers or {})
+    return openai.APIStatusError(f"status {status}", response=response, body=None)
+
+
+def test_retry_after_in_seconds():
+    assert retry_after(_status_error(429, {"Retry-After": "3"})) == 3.0
+    assert retry_after(_status_error(429, {"retry-after-ms": "250"})) == 0.25
+
+
+def test_retry_after_as_http_date():
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= retry_after(_status_error(503, {"Retry-After": format_datetime(when, usegmt=True)})) <= 30
+
+
+def test_retry_after_in_the_past_is_zero():
+    when = datetime.now(timezone.utc) - timedelta(minutes=5)
+    assert retry_after(_status_error(503, {"Retry-After": format_datetime(when, usegmt=True)})) == 0.0
+
+
+@pytest.mark.parametrize("headers", [{}, {"Retry-After": ""}, {"Retry-After": "soon"}])
+def test_missing_or_unreadable_retry_after(headers):
+    assert retry_after(_status_error(429, headers)) is None
+    assert retry_after(ValueError("no response")) is None
+
+
+def test_backoff_waits_as_long_as_the_server_asks_up_to_max_delay():
+    backoff = Backoff(max_delay=10)
+    assert backoff.delay(0, _status_error(429, {"Retry-After": "4"})) == 4.0
+    assert backoff.delay(0, _status_error(429, {"Retry-After": "120"})) == 10
+
+
+@pytest.mark.parametrize("status", [408, 409, 429, 500, 502, 503])
+def test_throttling_and_server_errors_are_retried(status):
+    assert is_retryable(_status_error(status))
+
+
+@pytest.mark.parametrize("status", [400, 401, 403, 404, 422])
+def test_client_errors_are_not_retried(status):
+    assert not is_retryable(_status_error(status))
+
+
+def test_backoff_retries_only_retryable_errors():
+    sleeps = []
+    backoff = Backoff(max_attempts=3, base_delay=1, jitter=0, sleep=sleeps.append)
+    failures = [_status_error(503), _status_error(429)]
+
+    def flaky():
+        if failures:
+            raise failures.pop(0)
+        return "ok"
+
+    assert backoff.call(flaky) == "ok"
+    assert sleeps == [1, 2]
+
+    calls = []
+
+    def rejected():
+        calls.append(1)
+        raise _status_error(400)
+
+    with pytest.raises(openai.APIStatusError):
+        backoff.call(rejected)
+    assert len(calls) == 1
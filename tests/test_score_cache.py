@@ -0,0 +1,43 @@
+"""Checks for the SQLite score cache"""
+import itertools
+import sqlite3
+
+import score_cache
+from score_cache import ScoreCache
+
+
+def test_hits_and_misses(tmp_path):
+    cache = ScoreCache(str(tmp_path / "scores.sqlite3"))
+    cache.put_many([("first slide", 7), ("second slide", 3)])
+    assert cache.get_many(["second slide", "unknown", "first  slide\n"]) == {0: 3, 2: 7}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 2)
+
+
+def test_keyed_by_model_and_prompt_version(tmp_path):
+    path = str(tmp_path / "scores.sqlite3")
+    ScoreCache(path, model="gpt-3.5-turbo", prompt_version=1).put_many([("slide", 7)])
+    assert ScoreCache(path, model="gpt-4o", prompt_version=1).get_many(["slide"]) == {}
+    assert ScoreCache(path, model="gpt-3.5-turbo", prompt_version=2).get_many(["slide"]) == {}
+    assert ScoreCache(path, model="gpt-3.5-turbo", prompt_version=1).get_many(["slide"]) == {0: 7}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = itertools.count()
+    monkeypatch.setattr(score_cache.time, "time", lambda: next(clock))
+    cache = ScoreCache(str(tmp_path / "scores.sqlite3"), max_entries=2)
+    cache.put_many([("old", 1)])
+    cache.put_many([("used", 2)])
+    cache.get_many(["old"])  # Now more recently used than "used"
+    cache.put_many([("new", 3)])
+    assert cache.get_many(["old", "used", "new"]) == {0: 1, 2: 3}
+    assert cache.stats()["entries"] == 2
+
+
+def test_scores_persist_across_reopening(tmp_path):
+    path = str(tmp_path / "scores.sqlite3")
+    ScoreCache(path).put_many([("slide", 9)])
+    reopened = ScoreCache(path)
+    assert reopened.get_many(["slide"]) == {0: 9}
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
@@ -0,0 +1,27 @@
+"""Recovery checks for the scoring journal"""
+from score_journal import ScoreJournal
+
+
+def test_torn_last_line_is_skipped_and_closed(tmp_path):
+    path = str(tmp_path / "scores.journal.jsonl")
+    ScoreJournal(path).record([0, 1], ["first", "second"], [7, 3])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"model": "gpt-3.5-turbo", "prompt_version": 1, "indices": [2], "ke')
+
+    journal = ScoreJournal(path)
+    assert journal.batches == 1
+    assert journal.get("first") == 7 and journal.get("second") == 3
+    assert journal.get("third") is None
+
+    journal.record([2], ["third"], [9])
+    reopened = ScoreJournal(path)
+    assert reopened.batches == 2
+    assert reopened.get("third") == 9
+
+
+def test_other_model_or_prompt_version_is_ignored(tmp_path):
+    path = str(tmp_path / "scores.journal.jsonl")
+    ScoreJournal(path, model="other").record([0], ["first"], [7])
+    ScoreJournal(path, prompt_version=2).record([0], ["first"], [5])
+    assert ScoreJournal(path).get("first") is None
+    assert ScoreJournal(path, prompt_version=2).get("first") == 5
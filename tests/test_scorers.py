@@ -0,0 +1,34 @@
+"""Checks for the offline BM25 centrality scorer"""
+from scorers import LocalScorer
+
+THEMED = [
+    "revenue growth market strategy customers pricing expansion forecast quarter targets",
+    "revenue growth in every market, customers up, pricing stable, forecast raised for the quarter",
+    "market strategy: customers, pricing and expansion drive revenue growth",
+]
+OFF_TOPIC = "office party photos and the cafeteria lunch menu"
+
+
+def test_slides_on_the_deck_theme_rank_above_off_topic_ones():
+    scores = dict(LocalScorer().score(THEMED + [OFF_TOPIC, "Thank you"]))
+    assert max(scores.values()) == 10
+    assert min(scores[i] for i in range(3)) > scores[3] > scores[4]
+
+
+def test_scores_come_back_in_slide_order_and_reach_the_sink():
+    received = []
+    scores = LocalScorer().score(iter(THEMED), sink=received.extend)
+    assert [i for i, _ in scores] == [0, 1, 2]
+    assert received == scores
+
+
+def test_empty_deck():
+    assert LocalScorer().score([]) == []
+
+
+def test_single_slide_deck():
+    assert LocalScorer().score(["quarterly revenue review"]) == [(0, 10.0)]
+
+
+def test_slides_without_terms_score_zero():
+    assert LocalScorer().score(["the and of", ""]) == [(0, 0.0), (1, 0.0)]
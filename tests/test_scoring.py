@@ -0,0 +1,25 @@
+"""Checks for batch_score_slides against a stubbed chat client"""
+from types import SimpleNamespace
+
+import main
+from metrics import PipelineMetrics
+
+
+class StubClient:
+    """Answers every chat completion with the same canned reply"""
+    def __init__(self, reply):
+        self.reply = reply
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        message = SimpleNamespace(content=self.reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_repeated_reply_line_does_not_hide_a_missing_slide(monkeypatch):
+    monkeypatch.setattr(main, "client", StubClient("Slide 1: 8\nSlide 1: 8\nSlide 2: 5"))
+    metrics = PipelineMetrics()
+    scores = main.batch_score_slides(["a", "b", "c"], batch_size=5, requests_per_second=None, metrics=metrics)
+    assert scores == [(0, 8), (1, 5)]
+    assert metrics.counters["slides_scored"] == 2
+    assert metrics.counters["slides_unscored"] == 1
@@ -0,0 +1,18 @@
+"""Checks for SlideSelector"""
+from main import parse_scores
+from selection import SlideSelector
+
+
+def test_repeated_index_takes_one_slot():
+    selector = SlideSelector(top_k=3)
+    selector.add_many([(0, 9), (0, 9), (1, 5)])
+    selector.add_many([(2, 4), (0, 9), (3, 1)])
+    assert selector.select() == [0, 1, 2]
+    assert selector.seen == 4
+
+
+def test_repeated_slide_in_a_reply():
+    scores = parse_scores("Slide 1: 8\nSlide 1: 8\nSlide 2: 6\nSlide 3: 3", [10, 11, 12])
+    selector = SlideSelector(top_k=2)
+    selector.add_many(scores)
+    assert selector.select() == [10, 11]
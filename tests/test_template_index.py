@@ -0,0 +1,51 @@
+"""Checks that the template is indexed once and its own slides are dropped cleanly"""
+import zipfile
+
+import pytest
+from pptx import Presentation
+
+import main2
+from main2 import PowerPointProcessor
+
+
+@pytest.fixture
+def template(tmp_path):
+    prs = Presentation()
+    for i in range(3):
+        prs.slides.add_slide(prs.slide_layouts[i]).shapes.title.text = f"Template slide {i}"
+    path = str(tmp_path / "template.pptx")
+    prs.save(path)
+    return path
+
+
+def _slides(count):
+    return [{'slide_number': i + 1, 'structured_content': {'type': 'structured_text', 'title': f"Slide {i}",
+                                                             'content': [f"Point {i}"]}}
+            for i in range(count)]
+
+
+def test_template_is_indexed_once_and_its_layouts_reused(template, tmp_path, monkeypatch):
+    loads = []
+    load = main2.TemplateIndex._load
+    monkeypatch.setattr(main2.TemplateIndex, "_load", lambda self: (loads.append(1), load(self))[1])
+    processor = PowerPointProcessor(template_path=template, image_dir=str(tmp_path / "pics"))
+    for run in range(2):
+        output = str(tmp_path / f"out{run}.pptx")
+        processor.create_presentation_from_template(_slides(2), output)
+        prs = Presentation(output)
+        assert [slide.shapes.title.text for slide in prs.slides] == ["Slide 0", "Slide 1"]
+        assert {slide.slide_layout.name for slide in prs.slides} == {"Title and Content"}
+    assert len(loads) == 1
+
+
+def test_no_template_slide_is_left_in_the_output(template, tmp_path):
+    output = str(tmp_path / "out.pptx")
+    processor = PowerPointProcessor(template_path=template, image_dir=str(tmp_path / "pics"))
+    processor.create_presentation_from_template(_slides(2), output)
+    with zipfile.ZipFile(output) as package:
+        slide_parts = [name for name in package.namelist()
+                       if name.startswith("ppt/slides/slide") and name.endswith(".xml")]
+        content_types = package.read("[Content_Types].xml").decode()
+    assert len(slide_parts) == 2
+    assert content_types.count("presentationml.slide+xml") == 2
+    assert "Template slide" not in "".join(slide.shapes.title.text for slide in Presentation(output).slides)
@@ -0,0 +1,50 @@
+"""Checks for how trim_presentation handles slides its scorer left unscored"""
+import os
+
+import pytest
+from pptx import Presentation
+
+from main import trim_presentation
+from scorers import SlideScorer
+
+
+class HalfScorer(SlideScorer):
+    """Scores every other slide and reports the rest as unscored"""
+    name = "half"
+
+    def __init__(self, resumable):
+        self.resumable = resumable
+
+    def score(self, slide_texts, metrics=None, journal=None, sink=None):
+        texts = list(slide_texts)
+        scores = [(i, 10 - i) for i in range(0, len(texts), 2)]
+        if journal is not None:
+            journal.record([i for i, _ in scores], [texts[i] for i, _ in scores], [score for _, score in scores])
+        sink(scores)
+        metrics.increment("slides_unscored", len(texts) - len(scores))
+        return scores
+
+
+@pytest.fixture
+def deck(tmp_path):
+    prs = Presentation()
+    for i in range(6):
+        prs.slides.add_slide(prs.slide_layouts[1]).shapes.title.text = f"Slide {i}"
+    path = str(tmp_path / "deck.pptx")
+    prs.save(path)
+    return path
+
+
+@pytest.mark.parametrize("resumable", [True, False])
+def test_unscored_slides_raise(deck, tmp_path, resumable):
+    output = str(tmp_path / "out.pptx")
+    with pytest.raises(RuntimeError, match="3 slides could not be scored"):
+        trim_presentation(deck, output, keep_fraction=0.5, scorer=HalfScorer(resumable))
+    assert os.path.exists(f"{output}.journal.jsonl") == resumable
+
+
+def test_partial_trim_keeps_the_journal(deck, tmp_path):
+    output = str(tmp_path / "out.pptx")
+    trim_presentation(deck, output, keep_fraction=0.5, scorer=HalfScorer(True), allow_partial=True)
+    assert len(Presentation(output).slides) == 3
+    assert os.path.exists(f"{output}.journal.jsonl")
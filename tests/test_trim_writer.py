@@ -0,0 +1,129 @@
+"""Round-trip checks for the trimmed package writers"""
+import zipfile
+from io import BytesIO
+
+import pytest
+from lxml import etree
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches
+
+import trim_writer
+from trim_writer import _R, read_rels, subset_package, write_trimmed_package
+
+
+@pytest.fixture
+def deck(tmp_path):
+    """Four slides with a picture on each; slide 0 links to slides 1 and 2"""
+    prs = Presentation()
+    slides = []
+    for i in range(4):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {i}"
+        buffer = BytesIO()
+        Image.new("RGB", (40, 30), (60 * i, 100, 150)).save(buffer, "PNG")
+        buffer.seek(0)
+        slide.shapes.add_picture(buffer, Inches(1), Inches(2))
+        slides.append(slide)
+    slides[0].shapes.title.click_action.target_slide = slides[1]
+    slides[0].placeholders[1].text_frame.text = "next"
+    slides[0].placeholders[1].click_action.target_slide = slides[2]
+    path = tmp_path / "deck.pptx"
+    prs.save(path)
+    return path
+
+
+def _dangling_references(path):
+    """(part, rId) for every r: attribute in a slide that names no relationship of that slide"""
+    dangling = []
+    with zipfile.ZipFile(path) as package:
+        for name in package.namelist():
+            if not (name.startswith("ppt/slides/slide") and name.endswith(".xml")):
+                continue
+            rel_ids = {rel.get("Id") for rel, _ in read_rels(package, name)[1]}
+            for element in etree.fromstring(package.read(name)).iter(etree.Element):
+                for key, value in element.attrib.items():
+                    if key.startswith(_R) and value not in rel_ids:
+                        dangling.append((name, value))
+    return dangling
+
+
+@pytest.mark.parametrize("writer", [subset_package, write_trimmed_package])
+@pytest.mark.parametrize("keep", [[0, 1], [0, 3], [2]])
+def test_trimmed_deck_round_trips(tmp_path, deck, writer, keep):
+    output = tmp_path / "trimmed.pptx"
+    writer(deck, output, keep)
+    with zipfile.ZipFile(output) as package:
+        assert package.testzip() is None
+    prs = Presentation(output)
+    assert [slide.shapes.title.text for slide in prs.slides] == [f"Slide {i}" for i in keep]
+    for slide in prs.slides:
+        pictures = [shape for shape in slide.shapes if shape.shape_type == 13]
+        assert len(pictures) == 1 and pictures[0].image.blob
+    assert _dangling_references(output) == []
+
+
+def test_links_to_kept_slides_survive(tmp_path, deck):
+    output = tmp_path / "trimmed.pptx"
+    subset_package(deck, output, [0, 1])
+    first = Presentation(output).slides[0]
+    assert first.shapes.title.click_action.target_slide.shapes.title.text == "Slide 1"
+    assert first.placeholders[1].click_action.hyperlink.address is None
+
+
+@pytest.mark.parametrize("writer", [subset_package, write_trimmed_package])
+def test_media_of_dropped_slides_is_left_out(tmp_path, deck, writer):
+    output = tmp_path / "trimmed.pptx"
+    writer(deck, output, [0, 3])
+    with zipfile.ZipFile(deck) as source, zipfile.ZipFile(output) as trimmed:
+        media = [name for name in trimmed.namelist() if name.startswith("ppt/media/")]
+        assert len(media) == 2
+        assert len([name for name in source.namelist() if name.startswith("ppt/media/")]) == 4
+        content_types = trimmed.read("[Content_Types].xml").decode()
+        assert "slide2.xml" not in content_types and "slide3.xml" not in content_types
+
+
+def test_raw_copy_preserves_entries(tmp_path):
+    source_path = tmp_path / "source.zip"
+    with zipfile.ZipFile(source_path, "w") as source:
+        source.writestr("deflated.txt", b"deflate me " * 5000, zipfile.ZIP_DEFLATED)
+        source.writestr("stored.bin", bytes(range(256)) * 300, zipfile.ZIP_STORED)
+        source.writestr("empty.txt", b"", zipfile.ZIP_DEFLATED)
+    copy_path = tmp_path / "copy.zip"
+    with zipfile.ZipFile(source_path) as source, zipfile.ZipFile(copy_path, "w") as target:
+        for info in source.infolist():
+            assert trim_writer._append_raw(target, info, trim_writer._raw_chunks(source, info))
+        target.writestr("added.txt", b"written after the raw entries")
+    with zipfile.ZipFile(source_path) as source, zipfile.ZipFile(copy_path) as copied:
+        assert copied.testzip() is None
+        for info in source.infolist():
+            out = copied.getinfo(info.filename)
+            assert (out.compress_type, out.CRC, out.compress_size) == (info.compress_type, info.CRC,
+                                                                       info.compress_size)
+            assert copied.read(info.filename) == source.read(info.filename)
+        assert copied.read("added.txt") == b"written after the raw entries"
+
+
+def test_raw_copy_falls_back_without_zipfile_internals(tmp_path, monkeypatch):
+    source_path = tmp_path / "source.zip"
+    with zipfile.ZipFile(source_path, "w", zipfile.ZIP_DEFLATED) as source:
+        source.writestr("part.xml", b"<a/>" * 1000)
+    monkeypatch.setattr(trim_writer, "_RAW_APPEND_ATTRIBUTES", trim_writer._RAW_APPEND_ATTRIBUTES + ("missing",))
+    copy_path = tmp_path / "copy.zip"
+    with zipfile.ZipFile(source_path) as source, zipfile.ZipFile(copy_path, "w") as target:
+        trim_writer._copy_raw(source, target, source.getinfo("part.xml"))
+    with zipfile.ZipFile(copy_path) as copied:
+        assert copied.read("part.xml") == b"<a/>" * 1000
+
+
+@pytest.mark.parametrize("writer", [subset_package, write_trimmed_package])
+def test_untested_python_falls_back_to_recompressing(tmp_path, deck, writer, monkeypatch):
+    monkeypatch.setattr(trim_writer, "RAW_APPEND_SUPPORTED", False)
+    with zipfile.ZipFile(tmp_path / "probe.zip", "w") as target, zipfile.ZipFile(deck) as source:
+        info = source.infolist()[0]
+        assert not trim_writer._append_raw(target, info, trim_writer._raw_chunks(source, info))
+    output = tmp_path / "trimmed.pptx"
+    writer(deck, output, [1, 2])
+    with zipfile.ZipFile(output) as package:
+        assert package.testzip() is None
+    assert [slide.shapes.title.text for slide in Presentation(output).slides] == ["Slide 1", "Slide 2"]